@@ -1,3 +1,4 @@
+from collections import defaultdict
 from decimal import Decimal
 from django.db import transaction
 from django.contrib.auth import get_user_model
@@ -102,6 +103,83 @@ class BalanceService:
             logger.error(f"Error refunding balance for user {user.email}: {e}")
             raise
     
+    @staticmethod
+    def _lock_wallets(user_ids):
+        """Wallets for ``user_ids`` by user id, created if missing and locked in pk order"""
+        Wallet.objects.bulk_create(
+            [Wallet(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+        )
+        return {
+            wallet.user_id: wallet
+            for wallet in Wallet.objects.select_for_update().filter(user_id__in=user_ids).order_by('pk')
+        }
+    
+    @staticmethod
+    @transaction.atomic
+    def _bulk_post(txn_type, entries):
+        """
+        Apply many ledger entries with a constant number of queries.
+
+        ``entries`` is an iterable of ``(user_id, amount, reference)``. Wallets are
+        locked once per batch, balances are written with one bulk update and the
+        transaction records with one bulk insert.
+        """
+        entries = [(user_id, Decimal(str(amount)), reference or '') for user_id, amount, reference in entries]
+        if not entries:
+            return []
+
+        totals = defaultdict(Decimal)
+        for user_id, amount, _ in entries:
+            totals[user_id] += amount
+
+        wallets = BalanceService._lock_wallets(totals)
+        for user_id, amount in totals.items():
+            wallets[user_id].balance += amount
+        Wallet.objects.bulk_update(wallets.values(), ['balance'])
+
+        txns = Transaction.objects.bulk_create([
+            Transaction(wallet=wallets[user_id], txn_type=txn_type, amount=amount, reference=reference)
+            for user_id, amount, reference in entries
+        ])
+        logger.info(f"Posted {len(txns)} {txn_type} entries across {len(wallets)} wallets")
+        return txns
+    
+    @staticmethod
+    def bulk_add_balance(entries):
+        """Post DEPOSIT entries for many users at once"""
+        return BalanceService._bulk_post(Transaction.DEPOSIT, entries)
+    
+    @staticmethod
+    @transaction.atomic
+    def bulk_deduct_balance(entries):
+        """
+        Post DEDUCT entries for many users at once without taking any wallet
+        below zero.
+
+        Each amount is capped at what the wallet still holds after the entries
+        before it, so points that were already spent are not recovered.
+        Returns the amount actually deducted for each entry, in order; entries
+        capped to zero post no transaction.
+        """
+        entries = [(user_id, Decimal(str(amount)), reference or '') for user_id, amount, reference in entries]
+        if not entries:
+            return []
+
+        wallets = BalanceService._lock_wallets({user_id for user_id, _, _ in entries})
+        deducted = []
+        txns = []
+        for user_id, amount, reference in entries:
+            wallet = wallets[user_id]
+            amount = min(amount, max(wallet.balance, Decimal('0')))
+            deducted.append(amount)
+            if amount > 0:
+                wallet.balance -= amount
+                txns.append(Transaction(wallet=wallet, txn_type=Transaction.DEDUCT, amount=amount, reference=reference))
+        Wallet.objects.bulk_update(wallets.values(), ['balance'])
+        Transaction.objects.bulk_create(txns)
+        logger.info(f"Posted {len(txns)} DEDUCT entries across {len(wallets)} wallets")
+        return deducted
+    
     @staticmethod
     def get_balance(user):
         """Get user's current balance"""
@@ -12,12 +12,13 @@ class WalletViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = WalletSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None
+    throttle_scope = None  # 'wallet' for deduct/refund
 
     def list(self, request, *args, **kwargs):
         balance = BalanceService.get_balance(request.user)
         return Response({"balance": str(balance)})
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_scope='wallet')
     def deduct(self, request):
         try:
             amount = request.data.get('amount')
@@ -34,7 +35,7 @@ class WalletViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         except Exception as e:
             return Response({'error': 'Failed to deduct balance'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_scope='wallet')
     def refund(self, request):
         try:
             amount = request.data.get('amount')
@@ -0,0 +1,107 @@
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse, JsonResponse
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+_IN_PROGRESS = 'in_progress'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method}:{request.path}:{body}".encode('utf-8')).hexdigest()
+
+
+def _stored(response):
+    if hasattr(response, 'data'):
+        return {'data': response.data}
+    return {'content': response.content.decode('utf-8'), 'content_type': response['Content-Type']}
+
+
+def _replay(record):
+    if 'data' in record:
+        response = Response(record['data'], status=record['status'])
+    else:
+        response = HttpResponse(record['content'], status=record['status'], content_type=record['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def warn_if_cache_not_shared():
+    if isinstance(caches['default'], LocMemCache):
+        logger.warning(
+            "Idempotency keys are kept in a per-process cache; set REDIS_URL so retries "
+            "that reach another worker are not run twice"
+        )
+
+
+def idempotent(view):
+    """
+    Honour an ``Idempotency-Key`` header on a DRF view handler.
+
+    The first response for a (user, key) pair is cached for
+    IDEMPOTENCY_KEY_TTL seconds and replayed for repeats without running the
+    view again. Reusing a key with a different request body returns 422, and
+    a repeat that arrives while the first request is still running gets 409.
+    5xx responses and exceptions are not stored, so those can be retried.
+    Anonymous requests and requests without the header run normally.
+
+    Works on function views (below ``@api_view``) and, through
+    ``method_decorator``, on class-based view methods.
+
+    Keys are held in the default cache, which must be shared between workers
+    (Redis via REDIS_URL) for a retry landing on another worker to be
+    recognised. With the per-process fallback cache each worker deduplicates
+    only its own requests; ``warn_if_cache_not_shared`` logs this at startup.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'error': 'Idempotency-Key must be at most 255 characters'}, status=400)
+
+        cache_key = f"idempotency:{request.user.pk}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+        fingerprint = _fingerprint(request)
+
+        if not cache.add(cache_key, _IN_PROGRESS, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            record = cache.get(cache_key)
+            if record == _IN_PROGRESS:
+                return JsonResponse({'error': 'A request with this Idempotency-Key is already in progress'}, status=409)
+            if record is not None:
+                if record['fingerprint'] != fingerprint:
+                    return JsonResponse(
+                        {'error': 'Idempotency-Key was already used with a different request'}, status=422
+                    )
+                return _replay(record)
+            # Expired between add() and get(); treat as a first request unless
+            # a concurrent repeat claimed the key in the meantime
+            if not cache.add(cache_key, _IN_PROGRESS, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                return JsonResponse({'error': 'A request with this Idempotency-Key is already in progress'}, status=409)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                {'fingerprint': fingerprint, 'status': response.status_code, **_stored(response)},
+                timeout=settings.IDEMPOTENCY_KEY_TTL,
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,158 @@
+"""
+JWT signing key ring.
+
+Keys are identified by ``kid`` and may be RSA (RS256), P-256 (ES256) or
+Ed25519 (EdDSA); the algorithm follows the key type, so switching algorithms
+is an ordinary rotation. The active key signs new tokens; every key in the
+ring (active, next and recently retired) verifies them and is published
+at ``/.well-known/jwks.json``. Rotation: add the next key to the ring so
+verifiers pick it up, switch ``JWT_ACTIVE_KID`` to it, and drop the old key
+once tokens signed with it have expired.
+
+Loaded by settings at import time, so this module must not import Django.
+"""
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+
+# Signing algorithms supported by the key ring, by key type
+ALGORITHMS = ('RS256', 'ES256', 'EdDSA')
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    public_key: Any
+    private_key: Optional[Any] = None
+
+    @property
+    def public_pem(self):
+        return self.public_key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode('ascii')
+
+    @property
+    def private_pem(self):
+        if self.private_key is None:
+            return None
+        return self.private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode('ascii')
+
+    def to_jwk(self):
+        jwk = _public_jwk(self.public_key)
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+
+def _public_jwk(public_key):
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return RSAAlgorithm.to_jwk(public_key, as_dict=True)
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return ECAlgorithm.to_jwk(public_key, as_dict=True)
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return OKPAlgorithm.to_jwk(public_key, as_dict=True)
+    raise ValueError(f"Unsupported JWT key type: {type(public_key).__name__}")
+
+
+def _algorithm_for(public_key):
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return 'RS256'
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+        return 'ES256'
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return 'EdDSA'
+    raise ValueError(f"Unsupported JWT key type: {type(public_key).__name__}")
+
+
+def generate_private_key(algorithm):
+    """New private key for ``algorithm`` (one of ALGORITHMS)"""
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+
+def thumbprint(public_key):
+    """RFC 7638 JWK thumbprint, used as the kid of keys that don't have one"""
+    jwk = _public_jwk(public_key)
+    required = {'RSA': ('e', 'kty', 'n'), 'EC': ('crv', 'kty', 'x', 'y'), 'OKP': ('crv', 'kty', 'x')}[jwk['kty']]
+    canonical = json.dumps({name: jwk[name] for name in required}, separators=(',', ':'), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def _make_key(kid, private_pem=None, public_pem=None):
+    private_key = serialization.load_pem_private_key(private_pem, password=None) if private_pem else None
+    public_key = private_key.public_key() if private_key else serialization.load_pem_public_key(public_pem)
+    return SigningKey(
+        kid=kid or thumbprint(public_key),
+        algorithm=_algorithm_for(public_key),
+        public_key=public_key,
+        private_key=private_key,
+    )
+
+
+class KeyRing:
+    def __init__(self, keys, active_kid):
+        self.keys = {key.kid: key for key in keys}
+        if active_kid not in self.keys or self.keys[active_kid].private_key is None:
+            raise ValueError(f"Active JWT key '{active_kid}' has no private key in the key ring")
+        self.active = self.keys[active_kid]
+
+    def get(self, kid):
+        return self.keys.get(kid)
+
+    def jwks(self):
+        """Public keys, active first"""
+        others = [key for kid, key in sorted(self.keys.items()) if kid != self.active.kid]
+        return {'keys': [key.to_jwk() for key in [self.active, *others]]}
+
+    @classmethod
+    def from_pem(cls, private_pem):
+        """Single-key ring (the kid is the key's thumbprint)"""
+        key = _make_key(None, private_pem=private_pem.encode('ascii'))
+        return cls([key], key.kid)
+
+    @classmethod
+    def from_directory(cls, path, active_kid=''):
+        """
+        Load ``<kid>.pem`` (private) and ``<kid>.pub.pem`` (public only, e.g.
+        next or retired keys) from ``path``. Without ``active_kid`` the
+        directory must hold exactly one private key.
+        """
+        directory = Path(path)
+        private = {p.name[:-len('.pem')]: p for p in directory.glob('*.pem') if not p.name.endswith('.pub.pem')}
+        public = {p.name[:-len('.pub.pem')]: p for p in directory.glob('*.pub.pem')}
+
+        keys = [_make_key(kid, private_pem=p.read_bytes()) for kid, p in private.items()]
+        keys += [_make_key(kid, public_pem=p.read_bytes()) for kid, p in public.items() if kid not in private]
+
+        if not active_kid:
+            if len(private) != 1:
+                raise ValueError(f"Set JWT_ACTIVE_KID: found {len(private)} private keys in {directory}")
+            active_kid = next(iter(private))
+        return cls(keys, active_kid)
+
+    @classmethod
+    def generate(cls, algorithm, kid=None):
+        """Single-key ring with a fresh key (benchmarks, local tooling)"""
+        private_key = generate_private_key(algorithm)
+        key = SigningKey(
+            kid=kid or thumbprint(private_key.public_key()),
+            algorithm=algorithm,
+            public_key=private_key.public_key(),
+            private_key=private_key,
+        )
+        return cls([key], key.kid)
@@ -0,0 +1,146 @@
+"""
+Media delivery.
+
+Django decides whether a request may read a file and the front proxy sends
+the bytes: with MEDIA_DELIVERY ``x-accel`` (nginx) the response only carries
+an ``X-Accel-Redirect`` to an internal location, with ``x-sendfile``
+(Apache/lighttpd) an ``X-Sendfile`` path, so large files never tie up a
+gunicorn worker. ``django`` streams the file itself, for development.
+
+A request may read a file if it carries a valid signature from
+``signed_media_url`` (an HMAC check, no database access), if the file is
+public (avatars; only content-hashed ones are cached as immutable), or if
+the authenticated user owns it or is an admin.
+"""
+import mimetypes
+import posixpath
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+
+_SALT = 'core.media'
+
+PUBLIC_PREFIXES = ('avatars/',)
+# Content-hashed avatars (avatars/<hh>/<sha256>[_<size>].<ext>) never change
+# meaning, unlike older per-user uploads under avatars/user_<id>/, which can
+# be overwritten and so are only cached briefly
+IMMUTABLE_NAME = re.compile(r'avatars/([0-9a-f]{2})/\1[0-9a-f]{62}(?:_\d+)?\.[a-z]+')
+LEGACY_PUBLIC_MAX_AGE = 300
+
+
+def _signature(name, expires):
+    return salted_hmac(_SALT, f"{name}:{expires}", algorithm='sha256').hexdigest()[:32]
+
+
+def signed_media_url(name, ttl=None):
+    """
+    MEDIA_URL path for ``name`` that is readable without credentials until it
+    expires. Expiry is rounded up to a multiple of the TTL, so URLs for the
+    same file stay identical (and browser-cacheable) within a window; a URL
+    lives between one and two TTLs.
+    """
+    ttl = ttl or settings.MEDIA_URL_TTL
+    expires = (int(time.time()) // ttl + 2) * ttl
+    query = urlencode({'expires': expires, 'signature': _signature(name, expires)})
+    return f"{settings.MEDIA_URL}{quote(name)}?{query}"
+
+
+def _valid_signature(name, params):
+    try:
+        expires = int(params.get('expires', ''))
+    except ValueError:
+        return None
+    if expires < time.time() or not constant_time_compare(params.get('signature', ''), _signature(name, expires)):
+        return None
+    return expires
+
+
+def _owns(user, name):
+    if name.startswith('bugs/'):
+        from feedback.models import BugReport
+
+        return BugReport.objects.filter(screenshot=name, user_id=user.pk).exists()
+    return False
+
+
+def _can_read(request, name):
+    if name.startswith(PUBLIC_PREFIXES):
+        return True
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    return user.is_admin or _owns(user, name)
+
+
+def media_response(name):
+    """Hand ``name`` (relative to MEDIA_ROOT) to the proxy, or stream it in ``django`` mode"""
+    path = safe_join(settings.MEDIA_ROOT, name)
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_DELIVERY == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_PREFIX}{quote(name)}"
+    elif settings.MEDIA_DELIVERY == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        try:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        except (FileNotFoundError, IsADirectoryError):
+            raise Http404("File not found")
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([AllowAny])
+def serve_media(request, name):
+    """Serve a file under MEDIA_ROOT after checking the caller may read it"""
+    name = posixpath.normpath(name).lstrip('/')
+    if name.startswith('..'):
+        raise Http404("File not found")
+
+    expires = _valid_signature(name, request.GET)
+    if expires is None and not _can_read(request, name):
+        # Same answer for missing and forbidden files
+        raise Http404("File not found")
+
+    try:
+        response = media_response(name)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+
+    if IMMUTABLE_NAME.fullmatch(name):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    elif name.startswith(PUBLIC_PREFIXES):
+        patch_cache_control(response, public=True, max_age=LEGACY_PUBLIC_MAX_AGE)
+    elif expires is not None:
+        patch_cache_control(response, private=True, max_age=max(expires - int(time.time()), 0))
+    else:
+        patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+class SignedFileField(serializers.FileField):
+    """FileField whose URLs are short-lived signed media URLs"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = signed_media_url(value.name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
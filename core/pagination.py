@@ -0,0 +1,35 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination with no COUNT(*) and no OFFSET scans.
+
+    Pairs with ``(user, created_at, id)`` indexes so every page is a single
+    index range read, however deep the client pages.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CursorPaginationOptionMixin:
+    """
+    Let list views switch to cursor pagination with ``?pagination=cursor``.
+
+    Page-number pagination stays the default so existing clients keep working;
+    cursor responses carry ``next``/``previous`` links and no ``count``.
+    """
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            if request is not None and request.query_params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
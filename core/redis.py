@@ -0,0 +1,29 @@
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Shared Redis client for the process, or None when REDIS_URL is not set.
+
+    The client keeps its own connection pool and is safe to use from threads.
+    """
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+                )
+    return _client
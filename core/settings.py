@@ -103,6 +103,46 @@ DATABASES = {
     }
 }
 
+# Redis (shared locks and coordination between workers); features that use it
+# degrade to per-process behaviour when REDIS_URL is empty
+REDIS_URL = config('REDIS_URL', default='')
+
+# Shared cache; falls back to a per-process cache when Redis is not configured
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Idempotency-Key replay window, and how long a first request may run before
+# a repeat of it is allowed through again
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+
+# Password hashing. Existing pbkdf2_sha256 hashes stay valid; the derivation
+# runs in a per-worker process pool of PASSWORD_HASH_WORKERS (0 hashes in the
+# request thread) so login bursts don't pin every request worker. The pooled
+# hasher replaces Django's PBKDF2PasswordHasher rather than sitting beside it:
+# both are named pbkdf2_sha256 and the later entry would verify the hashes.
+PASSWORD_HASHERS = [
+    'users.hashing.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=1_000_000, cast=int)
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+PASSWORD_HASH_MAX_PENDING = config('PASSWORD_HASH_MAX_PENDING', default=0, cast=int)  # 0: 4 per worker
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -144,6 +184,19 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# How /media/ files are sent once access is checked: 'django' streams them
+# (development), 'x-accel' hands them to nginx via X-Accel-Redirect to the
+# internal MEDIA_ACCEL_PREFIX location, 'x-sendfile' via X-Sendfile
+MEDIA_DELIVERY = config('MEDIA_DELIVERY', default='django')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Lifetime of signed media URLs (seconds); a URL is valid for one to two of these
+MEDIA_URL_TTL = config('MEDIA_URL_TTL', default=300, cast=int)
+
+# Avatars: square thumbnails (px) generated as WebP and JPEG by background threads
+AVATAR_THUMBNAIL_SIZES = (64, 128, 256)
+AVATAR_MAX_UPLOAD_SIZE = config('AVATAR_MAX_UPLOAD_SIZE', default=10 * 1024 * 1024, cast=int)
+AVATAR_WORKERS = config('AVATAR_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -154,6 +207,7 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'users.authentication.CustomJWTAuthentication',  # String path to avoid import
+        'users.authentication.ApiKeyAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -161,17 +215,56 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.TokenBucketThrottle',
+    ),
+    # Proxies in front of the app; client IPs are read from X-Forwarded-For past them
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# Token-bucket rate limits per view throttle_scope (core.throttling): a rate,
+# or rates by user role with '*' for everyone else. Buckets are per API key,
+# per user, or per IP for anonymous requests.
+RATE_LIMITS = {
+    'default': {'*': '600/min', 'ADMIN': '3000/min'},
+    'register': '20/hour',
+    'login': '20/min',
+    'wallet': {'*': '120/min', 'ADMIN': None},
+    'payments': {'*': '30/min', 'ADMIN': '300/min'},
+}
+RATE_LIMIT_LOCAL_MAX_KEYS = config('RATE_LIMIT_LOCAL_MAX_KEYS', default=100000, cast=int)
+RATE_LIMIT_REDIS_RETRY = config('RATE_LIMIT_REDIS_RETRY', default=5, cast=int)
+
 # JWT settings
 from datetime import timedelta
 
+from core.jwt_keys import KeyRing
+
+# Signing keys. Either a key ring directory (<kid>.pem private keys and
+# <kid>.pub.pem public-only keys, with JWT_ACTIVE_KID choosing the signing key)
+# or a single key pair, whose kid is its RFC 7638 thumbprint.
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+
 JWT_PRIVATE_KEY_PATH = os.getenv("JWT_PRIVATE_KEY_PATH", "/run/secrets/jwtRS256.key")
 JWT_PUBLIC_KEY_PATH  = os.getenv("JWT_PUBLIC_KEY_PATH",  "/run/secrets/jwtRS256.key.pub")
 
-PRIVATE_KEY = Path(JWT_PRIVATE_KEY_PATH).read_text()
-PUBLIC_KEY  = Path(JWT_PUBLIC_KEY_PATH).read_text()
+if JWT_KEYS_DIR:
+    JWT_KEY_RING = KeyRing.from_directory(JWT_KEYS_DIR, JWT_ACTIVE_KID)
+else:
+    JWT_KEY_RING = KeyRing.from_pem(Path(JWT_PRIVATE_KEY_PATH).read_text())
+
+PRIVATE_KEY = JWT_KEY_RING.active.private_pem
+PUBLIC_KEY  = JWT_KEY_RING.active.public_pem
 
+# How long verifiers may cache /.well-known/jwks.json; publish a new key at
+# least this long before making it active
+JWKS_MAX_AGE = config('JWKS_MAX_AGE', default=3600, cast=int)
+
+
+# Build request.user from access-token claims instead of loading the row on every
+# request; other fields load lazily on first use (see users.models.TokenUser)
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=True, cast=bool)
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -180,7 +273,7 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
 
-    "ALGORITHM": "RS256",
+    "ALGORITHM": JWT_KEY_RING.active.algorithm,
     "SIGNING_KEY": PRIVATE_KEY,      # private PEM
     "VERIFYING_KEY": PUBLIC_KEY,     # public PEM
 
@@ -193,7 +286,10 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Token classes sign with the active key and verify by kid against the key ring
+    'AUTH_TOKEN_CLASSES': ('users.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.KeyRingTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'users.serializers.KeyRingTokenVerifySerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
 
     'JTI_CLAIM': 'jti',
@@ -203,6 +299,17 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Revoked-token Bloom filter per worker (users.revocation): 8M bits and 7
+# hashes keep false positives near 1% up to ~800k live revocations
+REVOCATION_BLOOM_BITS = config('REVOCATION_BLOOM_BITS', default=1 << 23, cast=int)
+REVOCATION_BLOOM_HASHES = config('REVOCATION_BLOOM_HASHES', default=7, cast=int)
+REVOCATION_BLOOM_REBUILD_SECONDS = config('REVOCATION_BLOOM_REBUILD_SECONDS', default=3600, cast=int)
+
+# Verified API keys cached per worker (users.api_keys); the TTL bounds how long
+# a deactivated user's keys keep working, revocation applies immediately
+API_KEY_CACHE_TTL = config('API_KEY_CACHE_TTL', default=60, cast=int)
+API_KEY_CACHE_SIZE = config('API_KEY_CACHE_SIZE', default=10000, cast=int)
+
 # Swagger/OpenAPI settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Back For API',
@@ -227,4 +334,49 @@ SPECTACULAR_SETTINGS = {
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
-STRIPE_CURRENCY = 'usd'
\ No newline at end of file
+STRIPE_CURRENCY = 'usd'
+
+# Stripe client resilience: request timeout/retries, per-operation circuit breakers
+# and optional hedging of idempotent reads (STRIPE_HEDGE_AFTER=0 disables it)
+STRIPE_TIMEOUT = config('STRIPE_TIMEOUT', default=10, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=1, cast=int)
+STRIPE_BREAKER_WINDOW = config('STRIPE_BREAKER_WINDOW', default=20, cast=int)
+STRIPE_BREAKER_MIN_CALLS = config('STRIPE_BREAKER_MIN_CALLS', default=5, cast=int)
+STRIPE_BREAKER_FAILURE_RATE = config('STRIPE_BREAKER_FAILURE_RATE', default=0.5, cast=float)
+STRIPE_BREAKER_SLOW_CALL_SECONDS = config('STRIPE_BREAKER_SLOW_CALL_SECONDS', default=5, cast=float)
+STRIPE_BREAKER_RESET_TIMEOUT = config('STRIPE_BREAKER_RESET_TIMEOUT', default=30, cast=float)
+STRIPE_BREAKER_HALF_OPEN_PROBES = config('STRIPE_BREAKER_HALF_OPEN_PROBES', default=1, cast=int)
+STRIPE_HEDGE_AFTER = config('STRIPE_HEDGE_AFTER', default=0, cast=float)
+STRIPE_HEDGE_MAX_WORKERS = config('STRIPE_HEDGE_MAX_WORKERS', default=4, cast=int)
+
+# Single-flight coalescing of concurrent identical Stripe calls: how long the
+# cross-worker lock may be held and how long its result is shared with waiters
+STRIPE_SINGLEFLIGHT_LOCK_TIMEOUT = config('STRIPE_SINGLEFLIGHT_LOCK_TIMEOUT', default=15, cast=float)
+STRIPE_SINGLEFLIGHT_RESULT_TTL = config('STRIPE_SINGLEFLIGHT_RESULT_TTL', default=5, cast=float)
+
+# Seconds the in-process price catalog is served before reloading from the DB
+PRICE_CATALOG_TTL = config('PRICE_CATALOG_TTL', default=300, cast=int)
+
+# Bulk Stripe operations: worker pool size and request rate ceiling (Stripe allows ~100 req/s live)
+STRIPE_BULK_CONCURRENCY = config('STRIPE_BULK_CONCURRENCY', default=8, cast=int)
+STRIPE_BULK_RATE_LIMIT = config('STRIPE_BULK_RATE_LIMIT', default=25, cast=float)
+# Payments per bulk refund request. The refunds run inside the request, so
+# this over STRIPE_BULK_RATE_LIMIT must stay well under gunicorn's 30s timeout
+# or the worker is killed mid-batch with refunds issued but not recorded.
+STRIPE_BULK_REFUND_MAX = config('STRIPE_BULK_REFUND_MAX', default=100, cast=int)
+
+# Metered billing: meter event name used when a metered price has no
+# `meter_event_name` metadata (see `manage.py flush_usage`)
+STRIPE_METER_EVENT_NAME = config('STRIPE_METER_EVENT_NAME', default='tool_runs')
+
+# Creator payouts (see `manage.py run_payouts`): smallest amount worth a transfer,
+# and seconds before a payout stuck in processing is picked up again
+PAYOUT_MIN_AMOUNT = config('PAYOUT_MIN_AMOUNT', default=10, cast=float)
+PAYOUT_CLAIM_TIMEOUT = config('PAYOUT_CLAIM_TIMEOUT', default=600, cast=int)
+
+# Outbox relay (see `manage.py relay_outbox`)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+
+# Webhook event retention (see `manage.py webhook_retention`)
+WEBHOOK_COMPACT_AFTER_DAYS = config('WEBHOOK_COMPACT_AFTER_DAYS', default=7, cast=int)
+WEBHOOK_RETENTION_DAYS = config('WEBHOOK_RETENTION_DAYS', default=90, cast=int)
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.api_keys import ApiKeyService
+
+from .throttling import LocalBuckets, rate_limiter
+
+User = get_user_model()
+
+BALANCE_URL = '/api/balance/'
+
+
+class LocalBucketsTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('core.throttling.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buckets = LocalBuckets()
+
+    def test_denies_once_the_burst_is_spent(self):
+        self.assertEqual(self.buckets.take('k', 2, 1.0), (True, 1))
+        self.assertEqual(self.buckets.take('k', 2, 1.0), (True, 0))
+        self.assertEqual(self.buckets.take('k', 2, 1.0), (False, 0))
+
+    def test_refills_over_time_up_to_capacity(self):
+        self.buckets.take('k', 2, 1.0)
+        self.buckets.take('k', 2, 1.0)
+
+        self.now += 0.5
+        self.assertFalse(self.buckets.take('k', 2, 1.0)[0])
+        self.now += 0.5
+        self.assertTrue(self.buckets.take('k', 2, 1.0)[0])
+
+        self.now += 60
+        self.assertEqual(self.buckets.take('k', 2, 1.0), (True, 1))
+
+    def test_buckets_are_independent(self):
+        self.buckets.take('a', 1, 1.0)
+
+        self.assertFalse(self.buckets.take('a', 1, 1.0)[0])
+        self.assertTrue(self.buckets.take('b', 1, 1.0)[0])
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        # Fresh per-worker buckets for every test, and never Redis
+        for patcher in (
+            mock.patch.object(rate_limiter, '_local', LocalBuckets()),
+            mock.patch('core.throttling.get_redis_client', return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='secret')
+
+    def get_balance(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(BALANCE_URL)
+
+    @override_settings(RATE_LIMITS={'default': '2/min'})
+    def test_rate_limit_headers_and_retry_after(self):
+        first = self.get_balance(self.user)
+        second = self.get_balance(self.user)
+        throttled = self.get_balance(self.user)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['RateLimit-Limit'], '2')
+        self.assertEqual(first['RateLimit-Remaining'], '1')
+        self.assertEqual(first['RateLimit-Reset'], '30')
+        self.assertEqual(first['RateLimit-Policy'], '2;w=60')
+        self.assertEqual(second['RateLimit-Remaining'], '0')
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(throttled['Retry-After'], '30')
+        self.assertEqual(throttled['RateLimit-Remaining'], '0')
+
+    @override_settings(RATE_LIMITS={'default': {'*': '1/min', 'TOOL_CREATOR': '3/min', 'ADMIN': None}})
+    def test_limits_follow_the_user_role(self):
+        creator = User.objects.create_user(
+            email='creator@example.com', username='creator', password='secret', role=User.Role.TOOL_CREATOR,
+        )
+        admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='secret', role=User.Role.ADMIN,
+        )
+
+        self.assertEqual([self.get_balance(self.user).status_code for _ in range(2)], [200, 429])
+        self.assertEqual([self.get_balance(creator).status_code for _ in range(4)], [200, 200, 200, 429])
+        responses = [self.get_balance(admin) for _ in range(5)]
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertNotIn('RateLimit-Limit', responses[0])
+
+    def test_bucket_identity(self):
+        api_key, raw_key = ApiKeyService.issue(self.user)
+
+        with mock.patch.object(rate_limiter, 'take', wraps=rate_limiter.take) as take:
+            self.client.credentials(HTTP_AUTHORIZATION=f"Api-Key {raw_key}")
+            self.client.get(BALANCE_URL)
+            self.client.credentials()
+            self.get_balance(self.user)
+            self.client.force_authenticate(None)
+            self.client.post('/api/token/', {'email': 'nobody@example.com', 'password': 'wrong'}, REMOTE_ADDR='10.0.0.7')
+
+        self.assertEqual(
+            [call.args[0] for call in take.call_args_list],
+            [f"default:key:{api_key.prefix}", f"default:user:{self.user.pk}", 'login:ip:10.0.0.7'],
+        )
@@ -0,0 +1,170 @@
+"""
+Rate limiting.
+
+Every request takes a token from a bucket identified by the view's
+``throttle_scope`` and the caller: the API key for ``Api-Key`` requests, the
+user for other authenticated requests, the client IP otherwise. A bucket
+holds as many tokens as the rate's request count and refills continuously
+over its period, so short bursts up to the limit are allowed.
+
+Rates come from RATE_LIMITS, per scope and optionally per role. Buckets live
+in Redis and are updated by one Lua script call (a single round trip), so
+every worker shares them. Without REDIS_URL, or for RATE_LIMIT_REDIS_RETRY
+seconds after a Redis error, each worker keeps its own buckets instead: the
+effective limit is then per worker, but requests never wait on a dead Redis.
+
+Responses carry ``RateLimit-Limit``, ``RateLimit-Remaining``,
+``RateLimit-Reset`` and ``RateLimit-Policy`` headers; throttled ones get
+429 with ``Retry-After``.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from core.redis import get_redis_client
+from users.authentication import ApiKeyAuthentication
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'ratelimit:'
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS[1] bucket; ARGV capacity, refill per second. Uses the Redis clock so
+# workers with skewed clocks agree. Returns {allowed, tokens left}.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_rate(rate):
+    """``'100/min'`` -> ``(100, 60)``; None means unlimited"""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), _PERIODS[period.strip()[0]]
+
+
+def _refill(tokens, elapsed, capacity, per_second):
+    return min(capacity, tokens + max(elapsed, 0) * per_second)
+
+
+class LocalBuckets:
+    """In-process token buckets, LRU-bounded by RATE_LIMIT_LOCAL_MAX_KEYS"""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second):
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = capacity
+            else:
+                tokens = _refill(state[0], now - state[1], capacity, per_second)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > settings.RATE_LIMIT_LOCAL_MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RateLimiter:
+    def __init__(self):
+        self._local = LocalBuckets()
+        self._script = None
+        self._redis_retry_at = 0.0
+
+    def take(self, key, capacity, per_second):
+        """Take one token from ``key``; returns ``(allowed, tokens left)``"""
+        client = get_redis_client()
+        if client is not None and time.monotonic() >= self._redis_retry_at:
+            import redis
+
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+                allowed, tokens = self._script(keys=[_KEY_PREFIX + key], args=[capacity, per_second])
+                return bool(allowed), float(tokens)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiting falls back to per-worker buckets: {e}")
+                self._redis_retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY
+        return self._local.take(key, capacity, per_second)
+
+
+rate_limiter = RateLimiter()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle over ``rate_limiter``.
+
+    The scope is the class's ``scope`` if set (for function views), else the
+    view's ``throttle_scope``, else ``default``. Its RATE_LIMITS entry is a
+    rate such as ``'100/min'``, or a dict of rates by user role with ``'*'``
+    for everyone else, anonymous callers included. A rate of None disables
+    the limit.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        scope = self.scope or getattr(view, 'throttle_scope', None) or 'default'
+        rate = self.get_rate(scope, request.user)
+        if rate is None:
+            return True
+        capacity, period = rate
+        per_second = capacity / period
+
+        allowed, tokens = rate_limiter.take(f"{scope}:{self.get_identity(request)}", capacity, per_second)
+        self.wait_seconds = None if allowed else (1 - tokens) / per_second
+        view.headers.update({
+            'RateLimit-Limit': str(capacity),
+            'RateLimit-Remaining': str(int(tokens)),
+            'RateLimit-Reset': str(math.ceil((capacity - tokens) / per_second)),
+            'RateLimit-Policy': f"{capacity};w={period}",
+        })
+        return allowed
+
+    def get_rate(self, scope, user):
+        limits = settings.RATE_LIMITS.get(scope, settings.RATE_LIMITS['default'])
+        if isinstance(limits, dict):
+            role = user.role if user.is_authenticated else None
+            limits = limits.get(role, limits.get('*'))
+        return parse_rate(limits)
+
+    def get_identity(self, request):
+        if isinstance(request.successful_authenticator, ApiKeyAuthentication):
+            return f"key:{request.auth['prefix']}"
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def wait(self):
+        return self.wait_seconds
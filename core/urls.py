@@ -1,18 +1,21 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
 from users.serializers import CustomTokenObtainPairSerializer
+from users.views import TokenRevokeView
+from core.media import serve_media
+from core.views import jwks
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,6 +24,8 @@ urlpatterns = [
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
+    path('.well-known/jwks.json', jwks, name='jwks'),
     
     # API endpoints
     path('api/users/', include('users.urls')),
@@ -32,8 +37,7 @@ urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
\ No newline at end of file
+    # Access-checked media; the bytes are sent by the proxy (see core.media)
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:name>", serve_media, name='media'),
+] 
\ No newline at end of file
@@ -0,0 +1,19 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_GET
+
+# The key ring is fixed for the life of the process, so the document is built once
+JWKS_DOCUMENT = json.dumps(settings.JWT_KEY_RING.jwks(), separators=(',', ':'))
+JWKS_ETAG = f'"{hashlib.sha256(JWKS_DOCUMENT.encode("utf-8")).hexdigest()[:32]}"'
+
+
+@require_GET
+@cache_control(public=True, max_age=settings.JWKS_MAX_AGE)
+@etag(lambda request: JWKS_ETAG)
+def jwks(request):
+    """Public keys that verify our JWTs, by kid (RFC 7517)"""
+    return HttpResponse(JWKS_DOCUMENT, content_type='application/json')
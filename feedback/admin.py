@@ -1,6 +1,7 @@
 from django.contrib import admin
-from django.utils.safestring import mark_safe
+from django.utils.html import format_html
 
+from core.media import signed_media_url
 from .models import Suggestion, BugReport, Upvote
 
 # Inline for Upvotes inside Suggestion admin
@@ -29,7 +30,7 @@ class BugReportAdmin(admin.ModelAdmin):
     # show the screenshot thumbnail in detail view (optional)
     def screenshot_preview(self, obj):
         if obj.screenshot:
-            return mark_safe(f'<img src="{obj.screenshot.url}" style="max-height:200px;"/>')
+            return format_html('<img src="{}" style="max-height:200px;"/>', signed_media_url(obj.screenshot.name))
         return "-"
     readonly_fields += ('screenshot_preview',)
 
@@ -1,6 +1,7 @@
 # feedback/serializers.py
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
+from core.media import SignedFileField
 from .models import Suggestion, BugReport, Upvote
 
 class SuggestionSerializer(serializers.ModelSerializer):
@@ -14,6 +15,8 @@ class SuggestionSerializer(serializers.ModelSerializer):
         return obj.get('votes').count()
 
 class BugReportSerializer(serializers.ModelSerializer):
+    screenshot = SignedFileField(required=False, allow_null=True)
+
     class Meta:
         model = BugReport
         fields = ['id','title','description','screenshot','created_at']
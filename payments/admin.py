@@ -1,5 +1,7 @@
+import json
 from django.contrib import admin
-from .models import Payment, PaymentMethod, PaymentWebhook, Subscription
+from django.utils.html import format_html
+from .models import MeteredUsage, OutboxEvent, Payment, PaymentMethod, Payout, PaymentWebhook, StripePrice, StripeProduct, Subscription
 
 
 @admin.register(Payment)
@@ -9,9 +11,9 @@ class PaymentAdmin(admin.ModelAdmin):
         'points_amount', 'created_at', 'completed_at'
     ]
     list_filter = ['status', 'payment_type', 'currency', 'created_at']
-    search_fields = ['user__email', 'stripe_payment_intent_id', 'description']
+    search_fields = ['user__email', 'stripe_payment_intent_id', 'stripe_checkout_session_id', 'description']
     readonly_fields = [
-        'id', 'stripe_payment_intent_id', 'stripe_payment_method_id',
+        'id', 'stripe_payment_intent_id', 'stripe_checkout_session_id', 'stripe_payment_method_id',
         'stripe_customer_id', 'created_at', 'updated_at', 'completed_at'
     ]
     ordering = ['-created_at']
@@ -24,7 +26,10 @@ class PaymentAdmin(admin.ModelAdmin):
             'fields': ('description', 'points_amount', 'metadata')
         }),
         ('Stripe Information', {
-            'fields': ('stripe_payment_intent_id', 'stripe_payment_method_id', 'stripe_customer_id')
+            'fields': (
+                'stripe_payment_intent_id', 'stripe_checkout_session_id',
+                'stripe_payment_method_id', 'stripe_customer_id'
+            )
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'completed_at')
@@ -56,10 +61,23 @@ class PaymentWebhookAdmin(admin.ModelAdmin):
     list_filter = ['event_type', 'processed', 'created_at']
     search_fields = ['stripe_event_id', 'event_type']
     readonly_fields = [
-        'stripe_event_id', 'event_type', 'event_data',
-        'created_at', 'processed_at'
+        'stripe_event_id', 'event_type', 'event_payload',
+        'created_at', 'processed_at', 'compacted_at'
     ]
+    exclude = ['event_data']
     ordering = ['-created_at']
+    list_select_related = ['payment__user']
+    
+    def get_queryset(self, request):
+        # Payloads are only needed on the detail page; keep the changelist query slim
+        qs = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            qs = qs.defer('event_data', 'event_data_compressed')
+        return qs
+    
+    @admin.display(description='Event data')
+    def event_payload(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(obj.payload, indent=2))
 
 
 @admin.register(Subscription)
@@ -72,3 +90,58 @@ class SubscriptionAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'stripe_subscription_id', 'stripe_customer_id', 'price_id']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+
+
+@admin.register(StripeProduct)
+class StripeProductAdmin(admin.ModelAdmin):
+    list_display = ['stripe_product_id', 'name', 'active', 'updated_at']
+    list_filter = ['active']
+    search_fields = ['stripe_product_id', 'name']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(StripePrice)
+class StripePriceAdmin(admin.ModelAdmin):
+    list_display = [
+        'stripe_price_id', 'stripe_product_id', 'nickname', 'unit_amount', 'currency',
+        'price_type', 'recurring_interval', 'active', 'updated_at'
+    ]
+    list_filter = ['active', 'price_type', 'currency', 'recurring_interval', 'recurring_usage_type']
+    search_fields = ['stripe_price_id', 'stripe_product_id', 'nickname']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'payment', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['event_type', 'processed_at', 'created_at']
+    search_fields = ['payment__id', 'last_error']
+    readonly_fields = ['event_type', 'payment', 'payload', 'attempts', 'last_error', 'created_at', 'processed_at']
+    list_select_related = ['payment__user']
+    ordering = ['-created_at']
+
+
+@admin.register(MeteredUsage)
+class MeteredUsageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subscription', 'price_id', 'quantity', 'status', 'attempts', 'last_used_at', 'reported_at']
+    list_filter = ['status', 'created_at', 'reported_at']
+    search_fields = ['subscription__stripe_subscription_id', 'price_id']
+    readonly_fields = [
+        'subscription', 'price_id', 'quantity', 'status', 'attempts', 'last_error',
+        'created_at', 'last_used_at', 'reported_at'
+    ]
+    list_select_related = ['subscription__user']
+    ordering = ['-created_at']
+
+
+@admin.register(Payout)
+class PayoutAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'amount', 'currency', 'status', 'stripe_transfer_id', 'created_at', 'paid_at']
+    list_filter = ['status', 'created_at', 'paid_at']
+    search_fields = ['user__email', 'stripe_transfer_id', 'stripe_account_id']
+    readonly_fields = [
+        'id', 'user', 'amount', 'currency', 'status', 'stripe_account_id', 'stripe_transfer_id',
+        'failure_reason', 'created_at', 'claimed_at', 'paid_at'
+    ]
+    list_select_related = ['user']
+    ordering = ['-created_at']
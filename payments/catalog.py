@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .models import StripePrice, StripeProduct
+
+logger = logging.getLogger(__name__)
+
+
+PRICE_SYNC_FIELDS = [
+    'stripe_product_id', 'active', 'nickname', 'currency', 'unit_amount', 'price_type',
+    'recurring_interval', 'recurring_interval_count', 'recurring_usage_type', 'metadata',
+]
+PRODUCT_SYNC_FIELDS = ['name', 'description', 'active', 'metadata']
+
+
+def _product_from_stripe(obj):
+    return StripeProduct(
+        stripe_product_id=obj.get('id'),
+        name=obj.get('name') or '',
+        description=obj.get('description') or '',
+        active=bool(obj.get('active')),
+        metadata=obj.get('metadata') or {},
+    )
+
+
+def _price_from_stripe(obj):
+    product = obj.get('product')
+    recurring = obj.get('recurring') or {}
+    return StripePrice(
+        stripe_price_id=obj.get('id'),
+        stripe_product_id=product.get('id') if isinstance(product, dict) else product,
+        active=bool(obj.get('active')),
+        nickname=obj.get('nickname') or '',
+        currency=(obj.get('currency') or '').lower(),
+        unit_amount=obj.get('unit_amount'),
+        price_type=obj.get('type') or StripePrice.PriceType.ONE_TIME,
+        recurring_interval=recurring.get('interval') or '',
+        recurring_interval_count=recurring.get('interval_count'),
+        recurring_usage_type=recurring.get('usage_type') or '',
+        metadata=obj.get('metadata') or {},
+    )
+
+
+def upsert_products(stripe_products):
+    """Batched upsert of Stripe product objects"""
+    rows = [_product_from_stripe(obj) for obj in stripe_products]
+    if rows:
+        StripeProduct.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['stripe_product_id'],
+            update_fields=PRODUCT_SYNC_FIELDS + ['updated_at'],
+        )
+    return len(rows)
+
+
+def upsert_prices(stripe_prices):
+    """Batched upsert of Stripe price objects (and their products, when expanded)"""
+    rows = [_price_from_stripe(obj) for obj in stripe_prices]
+    upsert_products([obj['product'] for obj in stripe_prices if isinstance(obj.get('product'), dict)])
+    if rows:
+        StripePrice.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['stripe_price_id'],
+            update_fields=PRICE_SYNC_FIELDS + ['updated_at'],
+        )
+    return len(rows)
+
+
+class PriceCatalog:
+    """
+    In-process, read-mostly cache of active prices and their products.
+
+    The whole catalog is loaded with two queries and refreshed after
+    ``PRICE_CATALOG_TTL`` seconds; price.* / product.* webhooks invalidate it
+    immediately in the worker that receives them, and other workers pick the
+    change up within the TTL.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._prices = None
+        self._products = None
+        self._expires_at = 0.0
+
+    def _load(self):
+        now = time.monotonic()
+        if self._prices is not None and now < self._expires_at:
+            return self._prices, self._products
+        with self._lock:
+            if self._prices is None or time.monotonic() >= self._expires_at:
+                prices = {price.stripe_price_id: price for price in StripePrice.objects.filter(active=True)}
+                products = {
+                    product.stripe_product_id: product
+                    for product in StripeProduct.objects.filter(
+                        stripe_product_id__in={price.stripe_product_id for price in prices.values()}
+                    )
+                }
+                ttl = self.ttl if self.ttl is not None else settings.PRICE_CATALOG_TTL
+                self._prices, self._products = prices, products
+                self._expires_at = time.monotonic() + ttl
+            return self._prices, self._products
+
+    def get(self, price_id):
+        """Active price by Stripe id, or None"""
+        prices, _ = self._load()
+        return prices.get(price_id)
+
+    def get_product(self, product_id):
+        _, products = self._load()
+        return products.get(product_id)
+
+    def all(self):
+        prices, _ = self._load()
+        return list(prices.values())
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+
+price_catalog = PriceCatalog()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from payments.services import UsageService
+
+
+class Command(BaseCommand):
+    help = "Report locally aggregated metered usage to Stripe (run on a schedule, e.g. every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+
+        closed = 0
+        while True:
+            count = UsageService.close_open_usage(batch_size)
+            closed += count
+            if count < batch_size:
+                break
+
+        # Also picks up rows left flushing by an earlier failed or interrupted run
+        reported = failed = 0
+        last_id = 0
+        while True:
+            ok, errors, last_id = UsageService.report_batch(batch_size, after_id=last_id)
+            if not ok and not errors:
+                break
+            reported += ok
+            failed += errors
+
+        message = f"Closed {closed} usage aggregates; reported {reported}, failed {failed}"
+        if failed:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
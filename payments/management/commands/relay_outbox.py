@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services import OutboxRelay
+
+
+class Command(BaseCommand):
+    help = "Apply pending payment outbox events (balance credits, notifications) in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox and exit')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        total = 0
+        while True:
+            handled = OutboxRelay.relay_batch(batch_size)
+            total += handled
+            if handled:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Relayed {total} outbox events"))
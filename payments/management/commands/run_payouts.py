@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.services import PayoutService
+
+
+class Command(BaseCommand):
+    help = "Create payouts for tool creators owed revenue and transfer them via Stripe Connect (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-amount', type=str, default=None,
+                            help='Smallest owed amount to pay out (default: PAYOUT_MIN_AMOUNT)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Payouts claimed per transfer batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what is owed')
+
+    def handle(self, *args, **options):
+        min_amount = Decimal(options['min_amount'] or str(settings.PAYOUT_MIN_AMOUNT))
+        batch_size = max(options['batch_size'], 1)
+
+        if options['dry_run']:
+            owed = list(PayoutService.owed_creators(min_amount))
+            total = sum((row['owed'] for row in owed), Decimal('0'))
+            self.stdout.write(f"{len(owed)} creators owed {total} in total")
+            return
+
+        created = PayoutService.create_payouts(min_amount)
+        self.stdout.write(f"Created {created} payouts")
+
+        paid = failed = retry = 0
+        while True:
+            batch_paid, batch_failed, batch_retry = PayoutService.execute_batch(batch_size)
+            if not (batch_paid or batch_failed or batch_retry):
+                break
+            paid += batch_paid
+            failed += batch_failed
+            retry += batch_retry
+            if batch_retry and not (batch_paid or batch_failed):
+                # Stripe is failing transiently; leave the rest for the next run
+                break
+
+        message = f"Paid {paid} payouts; {failed} failed, {retry} transient errors"
+        if failed or retry:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,36 @@
+import stripe
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.catalog import price_catalog, upsert_prices, upsert_products
+
+
+class Command(BaseCommand):
+    help = "Sync the local price catalog (products and prices) from Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        page_size = min(max(options['page_size'], 1), 100)
+        try:
+            products = self._sync(stripe.Product.list(limit=page_size), upsert_products, page_size)
+            # Products were synced above, so prices don't need them expanded
+            prices = self._sync(stripe.Price.list(limit=page_size), upsert_prices, page_size)
+        except stripe.error.StripeError as e:
+            raise CommandError(f"Stripe error: {e}")
+
+        price_catalog.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Synced {products} products and {prices} prices"))
+
+    @staticmethod
+    def _sync(listing, upsert, page_size):
+        total = 0
+        batch = []
+        for obj in listing.auto_paging_iter():
+            batch.append(obj)
+            if len(batch) >= page_size:
+                total += upsert(batch)
+                batch = []
+        if batch:
+            total += upsert(batch)
+        return total
@@ -0,0 +1,72 @@
+import stripe
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.models import SyncCheckpoint
+from payments.services import SubscriptionSyncService
+from payments.utils import bounded_map
+
+CHECKPOINT_NAME = 'sync_subscriptions'
+
+
+class Command(BaseCommand):
+    help = "Reconcile local Subscription rows with Stripe (paged, batched and resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Subscriptions per Stripe page / DB batch (max 100)')
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of batches applied concurrently')
+        parser.add_argument('--status', default='all', help='Stripe subscription status filter')
+        parser.add_argument('--reset', action='store_true', help='Ignore the saved cursor and start from the beginning')
+
+    def handle(self, *args, **options):
+        page_size = min(max(options['page_size'], 1), 100)
+        checkpoint, _ = SyncCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        if options['reset']:
+            checkpoint.cursor = ''
+            checkpoint.processed = 0
+            checkpoint.save()
+
+        params = {
+            'limit': page_size,
+            'status': options['status'],
+            # Expanding customers lets us map unknown customers by email without per-row calls
+            'expand': ['data.customer'],
+        }
+        if checkpoint.cursor:
+            params['starting_after'] = checkpoint.cursor
+            self.stdout.write(f"Resuming after {checkpoint.cursor} ({checkpoint.processed} already processed)")
+
+        totals = {'created': 0, 'updated': 0, 'unchanged': 0, 'unmapped': 0}
+        try:
+            pages = self._pages(stripe.Subscription.list(**params).auto_paging_iter(), page_size)
+            for batch, stats, error in bounded_map(SubscriptionSyncService.sync_batch, pages, options['workers']):
+                if error:
+                    raise CommandError(f"Batch ending at {batch[-1].get('id')} failed: {error}")
+                for key, value in stats.items():
+                    totals[key] += value
+
+                # Batches complete in order, so everything up to here is durable
+                checkpoint.cursor = batch[-1].get('id')
+                checkpoint.processed += len(batch)
+                checkpoint.save(update_fields=['cursor', 'processed', 'updated_at'])
+        except stripe.error.StripeError as e:
+            raise CommandError(f"Stripe error: {e}. Re-run to resume after {checkpoint.cursor or 'start'}")
+
+        # A full pass finished; the next run starts from the beginning again
+        checkpoint.cursor = ''
+        checkpoint.save(update_fields=['cursor', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            "Subscription sync complete: "
+            + ", ".join(f"{key}={value}" for key, value in totals.items())
+        ))
+
+    @staticmethod
+    def _pages(iterator, page_size):
+        batch = []
+        for obj in iterator:
+            batch.append(obj)
+            if len(batch) >= page_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
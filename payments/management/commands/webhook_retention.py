@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from payments.models import PaymentWebhook
+
+
+class Command(BaseCommand):
+    help = "Compress payloads of processed webhook events and delete events past retention, in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact-after-days', type=int, default=settings.WEBHOOK_COMPACT_AFTER_DAYS)
+        parser.add_argument('--retention-days', type=int, default=settings.WEBHOOK_RETENTION_DAYS,
+                            help='Delete processed events older than this (0 disables deletion)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = max(options['batch_size'], 1)
+
+        # Purge first so rows about to be deleted are not compressed needlessly
+        deleted = 0
+        if options['retention_days'] > 0:
+            deleted = self.purge(now - timedelta(days=options['retention_days']), batch_size)
+        compacted = self.compact(now - timedelta(days=options['compact_after_days']), batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} webhook events, deleted {deleted}"))
+
+    def compact(self, cutoff, batch_size):
+        total = 0
+        last_pk = 0
+        while True:
+            # Each batch is its own short transaction so row locks are held briefly
+            with transaction.atomic():
+                rows = list(
+                    PaymentWebhook.objects.select_for_update(skip_locked=True)
+                    .filter(
+                        pk__gt=last_pk,
+                        processed=True,
+                        compacted_at__isnull=True,
+                        created_at__lt=cutoff,
+                    )
+                    .order_by('pk')
+                    .only('pk', 'event_data')[:batch_size]
+                )
+                if not rows:
+                    return total
+
+                compacted_at = timezone.now()
+                for row in rows:
+                    row.event_data_compressed = PaymentWebhook.compress_payload(row.event_data)
+                    row.event_data = None
+                    row.compacted_at = compacted_at
+                PaymentWebhook.objects.bulk_update(
+                    rows, ['event_data', 'event_data_compressed', 'compacted_at']
+                )
+            total += len(rows)
+            last_pk = rows[-1].pk
+
+    def purge(self, cutoff, batch_size):
+        total = 0
+        while True:
+            pks = list(
+                PaymentWebhook.objects.filter(processed=True, created_at__lt=cutoff)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return total
+            deleted, _ = PaymentWebhook.objects.filter(pk__in=pks).delete()
+            total += deleted
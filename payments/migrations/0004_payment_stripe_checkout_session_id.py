@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_sync_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='stripe_checkout_session_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
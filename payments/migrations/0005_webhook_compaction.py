@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_payment_stripe_checkout_session_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='compacted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='event_data_compressed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='paymentwebhook',
+            name='event_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhook',
+            index=models.Index(fields=['processed', 'created_at'], name='webhook_processed_created_idx'),
+        ),
+    ]
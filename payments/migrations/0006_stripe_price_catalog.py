@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_webhook_compaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripePrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_price_id', models.CharField(max_length=255, unique=True)),
+                ('stripe_product_id', models.CharField(db_index=True, max_length=255)),
+                ('active', models.BooleanField(default=True)),
+                ('nickname', models.CharField(blank=True, max_length=255)),
+                ('currency', models.CharField(max_length=3)),
+                ('unit_amount', models.PositiveIntegerField(blank=True, help_text='Amount in cents', null=True)),
+                ('price_type', models.CharField(choices=[('one_time', 'One Time'), ('recurring', 'Recurring')], max_length=20)),
+                ('recurring_interval', models.CharField(blank=True, max_length=10)),
+                ('recurring_interval_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stripe price',
+                'verbose_name_plural': 'Stripe prices',
+                'ordering': ['stripe_product_id', 'unit_amount'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StripeProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_product_id', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('active', models.BooleanField(default=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stripe product',
+                'verbose_name_plural': 'Stripe products',
+                'ordering': ['name'],
+            },
+        ),
+    ]
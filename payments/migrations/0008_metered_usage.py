@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeprice',
+            name='recurring_usage_type',
+            field=models.CharField(blank=True, help_text='licensed or metered', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='MeteredUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_id', models.CharField(max_length=255)),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('flushing', 'Flushing'), ('reported', 'Reported')], default='open', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField()),
+                ('reported_at', models.DateTimeField(blank=True, null=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='payments.subscription')),
+            ],
+            options={
+                'verbose_name': 'metered usage',
+                'verbose_name_plural': 'metered usage',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'reported'), _negated=True), fields=['status', 'created_at'], name='usage_unreported_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'open')), fields=('subscription', 'price_id'), name='usage_one_open_per_price')],
+            },
+        ),
+    ]
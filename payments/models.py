@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
+import json
 import uuid
+import zlib
 
 User = get_user_model()
 
@@ -34,6 +36,7 @@ class Payment(models.Model):
     
     # Stripe fields
     stripe_payment_intent_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    stripe_checkout_session_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     stripe_payment_method_id = models.CharField(max_length=255, null=True, blank=True)
     stripe_customer_id = models.CharField(max_length=255, null=True, blank=True)
     
@@ -53,6 +56,9 @@ class Payment(models.Model):
         verbose_name = _('payment')
         verbose_name_plural = _('payments')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='payment_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"Payment {self.id} - {self.user.email} - ${self.amount}"
@@ -102,19 +108,37 @@ class PaymentWebhook(models.Model):
     processed = models.BooleanField(default=False)
     payment = models.ForeignKey(Payment, on_delete=models.CASCADE, null=True, blank=True, related_name='webhooks')
     
-    # Raw event data
-    event_data = models.JSONField()
+    # Raw event data; moved into event_data_compressed once the event is compacted
+    event_data = models.JSONField(null=True, blank=True)
+    event_data_compressed = models.BinaryField(null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    compacted_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         verbose_name = _('payment webhook')
         verbose_name_plural = _('payment webhooks')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['processed', 'created_at'], name='webhook_processed_created_idx'),
+        ]
     
     def __str__(self):
         return f"Webhook {self.stripe_event_id} - {self.event_type}"
+    
+    @staticmethod
+    def compress_payload(data):
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 6)
+    
+    @property
+    def payload(self):
+        """Event data, transparently decompressed for compacted rows"""
+        if self.event_data is not None:
+            return self.event_data
+        if self.event_data_compressed:
+            return json.loads(zlib.decompress(bytes(self.event_data_compressed)))
+        return None
 
 
 class Subscription(models.Model):
@@ -152,6 +176,213 @@ class Subscription(models.Model):
         verbose_name = _('subscription')
         verbose_name_plural = _('subscriptions')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='subscription_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Subscription {self.stripe_subscription_id} - {self.user.email} - {self.status}"
+
+
+class SyncCheckpoint(models.Model):
+    """Resumable cursor for long-running Stripe sync jobs"""
+
+    name = models.CharField(max_length=100, unique=True)
+    cursor = models.CharField(max_length=255, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('sync checkpoint')
+        verbose_name_plural = _('sync checkpoints')
+
+    def __str__(self):
+        return f"Checkpoint {self.name} - {self.cursor or 'start'}"
+
+
+class StripeProduct(models.Model):
+    """Local copy of a Stripe product, synced via `sync_prices` and product.* webhooks"""
+
+    stripe_product_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    active = models.BooleanField(default=True)
+    metadata = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Stripe product')
+        verbose_name_plural = _('Stripe products')
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name or self.stripe_product_id}"
+
+
+class StripePrice(models.Model):
+    """Local copy of a Stripe price, synced via `sync_prices` and price.* webhooks"""
+
+    class PriceType(models.TextChoices):
+        ONE_TIME = 'one_time', _('One Time')
+        RECURRING = 'recurring', _('Recurring')
+
+    stripe_price_id = models.CharField(max_length=255, unique=True)
+    stripe_product_id = models.CharField(max_length=255, db_index=True)
+    active = models.BooleanField(default=True)
+    nickname = models.CharField(max_length=255, blank=True)
+    currency = models.CharField(max_length=3)
+    unit_amount = models.PositiveIntegerField(null=True, blank=True, help_text=_('Amount in cents'))
+    price_type = models.CharField(max_length=20, choices=PriceType.choices)
+    recurring_interval = models.CharField(max_length=10, blank=True)
+    recurring_interval_count = models.PositiveIntegerField(null=True, blank=True)
+    recurring_usage_type = models.CharField(max_length=10, blank=True, help_text=_('licensed or metered'))
+    metadata = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Stripe price')
+        verbose_name_plural = _('Stripe prices')
+        ordering = ['stripe_product_id', 'unit_amount']
+
+    def __str__(self):
+        return f"Price {self.stripe_price_id} - {self.unit_amount} {self.currency}"
+
+    @property
+    def is_recurring(self):
+        return self.price_type == self.PriceType.RECURRING
+
+    @property
+    def is_metered(self):
+        return self.is_recurring and self.recurring_usage_type == 'metered'
+
+
+class OutboxEvent(models.Model):
+    """Side effect recorded in the same transaction as a payment state change, applied by `relay_outbox`"""
+
+    class EventType(models.TextChoices):
+        PAYMENT_SUCCEEDED = 'payment.succeeded', _('Payment Succeeded')
+
+    event_type = models.CharField(max_length=50, choices=EventType.choices)
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, null=True, blank=True, related_name='outbox_events')
+    payload = models.JSONField(default=dict, blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('outbox event')
+        verbose_name_plural = _('outbox events')
+        ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'], name='outbox_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.event_type} - {self.payment_id}"
+
+
+class MeteredUsage(models.Model):
+    """
+    Usage of a metered subscription price, aggregated locally and reported to
+    Stripe as one meter event per row by `flush_usage`.
+
+    Each (subscription, price) has at most one open row that usage is added
+    to; flushing moves it to ``flushing`` (new usage then opens a fresh row)
+    and to ``reported`` once Stripe has accepted it.
+    """
+
+    class UsageStatus(models.TextChoices):
+        OPEN = 'open', _('Open')
+        FLUSHING = 'flushing', _('Flushing')
+        REPORTED = 'reported', _('Reported')
+
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='usage')
+    price_id = models.CharField(max_length=255)
+    quantity = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UsageStatus.choices, default=UsageStatus.OPEN)
+
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField()
+    reported_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('metered usage')
+        verbose_name_plural = _('metered usage')
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'price_id'], name='usage_one_open_per_price',
+                condition=models.Q(status='open'),
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'created_at'], name='usage_unreported_idx',
+                condition=~models.Q(status='reported'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Usage {self.price_id} x{self.quantity} - {self.status}"
+
+    @property
+    def identifier(self):
+        """Meter event identifier; stable across retries so Stripe drops duplicates"""
+        return f"usage-{self.pk}"
+
+
+class Payout(models.Model):
+    """Transfer of earned revenue to a tool creator's Stripe Connect account"""
+
+    class PayoutStatus(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        PROCESSING = 'processing', _('Processing')
+        PAID = 'paid', _('Paid')
+        FAILED = 'failed', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payouts')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text=_('Amount in USD'))
+    currency = models.CharField(max_length=3, default='USD')
+    status = models.CharField(max_length=20, choices=PayoutStatus.choices, default=PayoutStatus.PENDING)
+
+    stripe_account_id = models.CharField(max_length=255)
+    stripe_transfer_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    failure_reason = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('payout')
+        verbose_name_plural = _('payouts')
+        ordering = ['-created_at']
+        constraints = [
+            # A creator has at most one payout in flight, which makes payout runs safe to repeat
+            models.UniqueConstraint(
+                fields=['user'], name='payout_one_open_per_user',
+                condition=models.Q(status__in=['pending', 'processing']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Payout {self.id} - {self.user.email} - ${self.amount} - {self.status}"
+
+    @property
+    def idempotency_key(self):
+        return f"payout-{self.id}"
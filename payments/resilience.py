@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import stripe
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(stripe.error.APIConnectionError):
+    """Raised instead of calling Stripe while a breaker is open"""
+
+
+# Errors that say Stripe (or the network to it) is unhealthy. Card declines and
+# invalid requests are the caller's problem and never trip a breaker.
+BREAKER_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.APIError,
+    stripe.error.RateLimitError,
+)
+
+
+class CircuitBreaker:
+    """
+    Per-operation circuit breaker.
+
+    Outcomes of the last ``window_size`` calls are kept; once at least
+    ``min_calls`` are recorded and the share of failed or slow calls reaches
+    ``failure_rate`` the breaker opens and calls fail fast. After
+    ``reset_timeout`` seconds it goes half-open and lets ``half_open_probes``
+    calls through: a successful probe closes it, a failed one re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window_size, min_calls, failure_rate, slow_call_seconds,
+                 reset_timeout, half_open_probes):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.trip_count = 0
+        self.rejected_count = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN or (
+                state == self.HALF_OPEN and self._probes_in_flight >= self.half_open_probes
+            ):
+                self.rejected_count += 1
+                raise CircuitOpenError(f"Stripe circuit '{self.name}' is open; failing fast")
+            if state == self.HALF_OPEN:
+                self._probes_in_flight += 1
+            return state
+
+    def _after_call(self, state, failed):
+        with self._lock:
+            if state == self.HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if failed:
+                    self._trip()
+                else:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(self._outcomes)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._trip()
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trip_count += 1
+        logger.warning(f"Stripe circuit '{self.name}' opened (trip #{self.trip_count})")
+
+    def call(self, func, /, *args, **kwargs):
+        state = self._before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except BREAKER_ERRORS:
+            self._after_call(state, failed=True)
+            raise
+        except Exception:
+            # Client-side errors say nothing about Stripe's health
+            self._after_call(state, failed=False)
+            raise
+        self._after_call(state, failed=time.monotonic() - started > self.slow_call_seconds)
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self._current_state(),
+                'trip_count': self.trip_count,
+                'rejected_count': self.rejected_count,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': sum(self._outcomes),
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                window_size=settings.STRIPE_BREAKER_WINDOW,
+                min_calls=settings.STRIPE_BREAKER_MIN_CALLS,
+                failure_rate=settings.STRIPE_BREAKER_FAILURE_RATE,
+                slow_call_seconds=settings.STRIPE_BREAKER_SLOW_CALL_SECONDS,
+                reset_timeout=settings.STRIPE_BREAKER_RESET_TIMEOUT,
+                half_open_probes=settings.STRIPE_BREAKER_HALF_OPEN_PROBES,
+            )
+        return _breakers[name]
+
+
+def breaker_snapshot():
+    """State and trip counts of every breaker used by this worker"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in sorted(breakers, key=lambda b: b.name)]
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=settings.STRIPE_HEDGE_MAX_WORKERS, thread_name_prefix='stripe-hedge'
+            )
+        return _hedge_executor
+
+
+def hedged_call(func, /, *args, **kwargs):
+    """
+    Call an idempotent read, firing one duplicate request if the first has not
+    answered within STRIPE_HEDGE_AFTER seconds; the first success wins.
+    Disabled (plain call) when STRIPE_HEDGE_AFTER is 0.
+    """
+    hedge_after = settings.STRIPE_HEDGE_AFTER
+    if not hedge_after:
+        return func(*args, **kwargs)
+
+    executor = _get_hedge_executor()
+    pending = {executor.submit(func, *args, **kwargs)}
+    done, _ = wait(pending, timeout=hedge_after)
+    if not done:
+        pending.add(executor.submit(func, *args, **kwargs))
+
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_stripe(name, func, /, *args, hedge=False, **kwargs):
+    """Run a Stripe call through the named breaker; ``hedge`` only for idempotent reads"""
+    breaker = get_breaker(name)
+    if hedge:
+        return breaker.call(hedged_call, func, *args, **kwargs)
+    return breaker.call(func, *args, **kwargs)
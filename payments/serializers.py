@@ -1,5 +1,7 @@
+from decimal import Decimal
+from django.conf import settings
 from rest_framework import serializers
-from .models import Payment, PaymentMethod, PaymentWebhook, Subscription
+from .models import Payment, PaymentMethod, PaymentWebhook, StripePrice, Subscription
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -78,8 +80,23 @@ class RefundPaymentSerializer(serializers.Serializer):
     """Serializer for refunding payments"""
     
     payment_id = serializers.UUIDField()
-    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-    reason = serializers.CharField(max_length=500, required=False) 
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'))
+    reason = serializers.CharField(max_length=500, required=False)
+
+
+class BulkRefundPaymentSerializer(serializers.Serializer):
+    """Serializer for refunding many payments at once"""
+    
+    payment_ids = serializers.ListField(
+        child=serializers.UUIDField(), min_length=1, max_length=settings.STRIPE_BULK_REFUND_MAX
+    )
+    reason = serializers.CharField(max_length=500, required=False)
+
+
+class RecordUsageSerializer(serializers.Serializer):
+    """Serializer for recording metered usage"""
+    
+    quantity = serializers.IntegerField(min_value=1, max_value=1_000_000, default=1)
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -90,4 +107,29 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'current_period_start', 'current_period_end', 'trial_end',
             'cancel_at_period_end', 'canceled_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = fields
\ No newline at end of file
+        read_only_fields = fields
+
+class PriceSerializer(serializers.ModelSerializer):
+    """Serializer for catalog prices, with product details from the local catalog"""
+    product_name = serializers.SerializerMethodField()
+    product_description = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = StripePrice
+        fields = [
+            'stripe_price_id', 'stripe_product_id', 'product_name', 'product_description',
+            'nickname', 'currency', 'unit_amount', 'price_type',
+            'recurring_interval', 'recurring_interval_count', 'recurring_usage_type'
+        ]
+        read_only_fields = fields
+    
+    def _product(self, obj):
+        return self.context['catalog'].get_product(obj.stripe_product_id)
+    
+    def get_product_name(self, obj) -> str:
+        product = self._product(obj)
+        return product.name if product else ''
+    
+    def get_product_description(self, obj) -> str:
+        product = self._product(obj)
+        return product.description if product else ''
@@ -0,0 +1,714 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import stripe
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mass_mail
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from balance.services import BalanceService
+from users.models import UserProfile
+from .catalog import price_catalog
+from .models import MeteredUsage, OutboxEvent, Payment, PaymentMethod, Payout, Subscription
+from .utils import RateLimiter, StripeService, bounded_map
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+SUBSCRIPTION_SYNC_FIELDS = [
+    'user', 'stripe_customer_id', 'status', 'price_id', 'quantity',
+    'current_period_start', 'current_period_end', 'trial_end',
+    'cancel_at_period_end', 'canceled_at', 'metadata',
+]
+
+
+def safe_ts_to_dt(timestamp_value):
+    """Convert a Stripe unix timestamp to an aware datetime (or None)"""
+    if not timestamp_value:
+        return None
+    try:
+        return datetime.fromtimestamp(int(timestamp_value), tz=dt_timezone.utc)
+    except Exception:
+        return None
+
+
+def subscription_fields_from_stripe(stripe_subscription_obj):
+    """Map a Stripe subscription object to local Subscription field values (without user)"""
+    obj = stripe_subscription_obj
+
+    # Pull primary item for price/quantity
+    items = obj.get('items') or {}
+    items_data = items.get('data') or []
+    primary_item = items_data[0] if items_data else None
+    price_id = None
+    quantity = 1
+    if primary_item:
+        price = primary_item.get('price')
+        price_id = price.get('id') if price else None
+        quantity = primary_item.get('quantity', 1)
+
+    customer = obj.get('customer')
+    customer_id = customer.get('id') if isinstance(customer, dict) else customer
+
+    return {
+        'stripe_customer_id': customer_id,
+        'status': obj.get('status') or Subscription.SubscriptionStatus.INCOMPLETE,
+        'price_id': price_id or '',
+        'quantity': quantity or 1,
+        'current_period_start': safe_ts_to_dt(obj.get('current_period_start')),
+        'current_period_end': safe_ts_to_dt(obj.get('current_period_end')),
+        'trial_end': safe_ts_to_dt(obj.get('trial_end')),
+        'cancel_at_period_end': bool(obj.get('cancel_at_period_end')),
+        'canceled_at': safe_ts_to_dt(obj.get('canceled_at')),
+        'metadata': obj.get('metadata') or {},
+    }
+
+
+def payment_method_fields_from_stripe(stripe_payment_method_obj):
+    """Map a Stripe payment method object to local PaymentMethod card fields"""
+    card = stripe_payment_method_obj.get('card') or {}
+    return {
+        'card_brand': card.get('brand') or '',
+        'card_last4': card.get('last4') or '',
+        'card_exp_month': card.get('exp_month'),
+        'card_exp_year': card.get('exp_year'),
+    }
+
+
+class PaymentMethodSyncService:
+    """Service class for keeping PaymentMethod rows in step with Stripe"""
+
+    @staticmethod
+    def upsert(stripe_payment_method_obj, user, customer_id, set_as_default=False):
+        """Create or refresh the local row for an attached payment method"""
+        defaults = payment_method_fields_from_stripe(stripe_payment_method_obj)
+        defaults.update(user=user, stripe_customer_id=customer_id, is_active=True)
+        if set_as_default:
+            defaults['is_default'] = True
+
+        with transaction.atomic():
+            pm, _ = PaymentMethod.objects.update_or_create(
+                stripe_payment_method_id=stripe_payment_method_obj.get('id'),
+                defaults=defaults,
+            )
+            if pm.is_default:
+                PaymentMethod.objects.filter(user=user).exclude(id=pm.id).update(is_default=False)
+        return pm
+
+    @staticmethod
+    def update_details(stripe_payment_method_obj):
+        """Apply card changes (e.g. new expiry) to an existing row; returns rows updated"""
+        return PaymentMethod.objects.filter(
+            stripe_payment_method_id=stripe_payment_method_obj.get('id')
+        ).update(updated_at=timezone.now(), **payment_method_fields_from_stripe(stripe_payment_method_obj))
+
+    @staticmethod
+    def deactivate(stripe_payment_method_id):
+        """Mark a detached payment method inactive; returns rows updated"""
+        return PaymentMethod.objects.filter(stripe_payment_method_id=stripe_payment_method_id).update(
+            is_active=False, is_default=False, updated_at=timezone.now()
+        )
+
+
+class PaymentService:
+    """Service class for payment state transitions"""
+
+    @staticmethod
+    @transaction.atomic
+    def complete_payment(payment, **stripe_fields):
+        """
+        Mark a payment as succeeded and queue its side effects.
+
+        The status change is a conditional UPDATE, so when the success redirect,
+        the confirm call and the webhook race only one of them completes the
+        payment. The balance credit and notification are written to the outbox
+        in the same transaction and applied later by ``OutboxRelay``, so callers
+        return as soon as the status commits. Returns True if this call completed it.
+        """
+        completed_at = timezone.now()
+        updated = Payment.objects.filter(
+            pk=payment.pk,
+            status__in=[Payment.PaymentStatus.PENDING, Payment.PaymentStatus.PROCESSING],
+        ).update(status=Payment.PaymentStatus.SUCCEEDED, completed_at=completed_at, updated_at=completed_at, **stripe_fields)
+        if not updated:
+            if stripe_fields:
+                # Already completed elsewhere; still record the Stripe identifiers
+                Payment.objects.filter(pk=payment.pk).update(**stripe_fields)
+            return False
+
+        payment.status = Payment.PaymentStatus.SUCCEEDED
+        payment.completed_at = completed_at
+        for field, value in stripe_fields.items():
+            setattr(payment, field, value)
+
+        OutboxEvent.objects.create(
+            event_type=OutboxEvent.EventType.PAYMENT_SUCCEEDED,
+            payment=payment,
+            payload={
+                'user_id': payment.user_id,
+                'amount': str(payment.amount),
+                'currency': payment.currency,
+                'payment_type': payment.payment_type,
+                'points_amount': payment.points_amount,
+            },
+        )
+        return True
+
+
+class OutboxRelay:
+    """Applies pending outbox events (balance credits, notifications) in batches"""
+
+    @staticmethod
+    def relay_batch(batch_size=100):
+        """
+        Process one batch of pending events and return how many were handled.
+
+        Events are claimed with SKIP LOCKED so several relays can run side by
+        side. Credits for the whole batch are posted with one bulk ledger write
+        in the same transaction that marks the events processed, so a crash
+        never credits twice or loses a credit. Events that keep failing are left
+        for inspection after OUTBOX_MAX_ATTEMPTS. Notifications are sent after
+        commit and are best effort.
+        """
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True, attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)
+                .order_by('created_at')[:batch_size]
+            )
+            if not events:
+                return 0
+
+            failed = {}
+            try:
+                with transaction.atomic():
+                    OutboxRelay._apply(events)
+            except Exception as e:
+                # Fall back to one event at a time so a bad event can't block the batch
+                logger.error(f"Outbox batch failed, retrying events individually: {e}")
+                for event in events:
+                    try:
+                        with transaction.atomic():
+                            OutboxRelay._apply([event])
+                    except Exception as event_error:
+                        failed[event.pk] = event_error
+
+            for pk, error in failed.items():
+                logger.error(f"Outbox event {pk} failed: {error}")
+                OutboxEvent.objects.filter(pk=pk).update(attempts=F('attempts') + 1, last_error=str(error)[:1000])
+
+            done = [event for event in events if event.pk not in failed]
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in done]).update(
+                processed_at=timezone.now(), attempts=F('attempts') + 1, last_error=''
+            )
+            transaction.on_commit(lambda: OutboxRelay._notify(done))
+        return len(done)
+
+    @staticmethod
+    def _apply(events):
+        ledger_entries = []
+        for event in events:
+            if event.event_type == OutboxEvent.EventType.PAYMENT_SUCCEEDED:
+                entry = OutboxRelay._payment_credit(event)
+                if entry:
+                    ledger_entries.append(entry)
+        BalanceService.bulk_add_balance(ledger_entries)
+
+    @staticmethod
+    def _payment_credit(event):
+        payload = event.payload
+        if payload.get('payment_type') != Payment.PaymentType.POINTS_PURCHASE or not payload.get('points_amount'):
+            return None
+        balance_amount = BalanceService.convert_payment_to_balance(
+            payload['amount'], payload['points_amount']
+        )
+        return (payload['user_id'], balance_amount, f"payment_{event.payment_id}")
+
+    @staticmethod
+    def _notify(events):
+        user_ids = {event.payload.get('user_id') for event in events}
+        opted_out = set(
+            UserProfile.objects.filter(user_id__in=user_ids, email_notifications=False)
+            .values_list('user_id', flat=True)
+        )
+        emails = dict(User.objects.filter(id__in=user_ids - opted_out).values_list('id', 'email'))
+        messages = [
+            (
+                'Payment received',
+                f"We received your payment of {event.payload['amount']} {event.payload.get('currency', '')}.",
+                None,
+                [emails[event.payload['user_id']]],
+            )
+            for event in events
+            if event.event_type == OutboxEvent.EventType.PAYMENT_SUCCEEDED
+            and event.payload.get('user_id') in emails
+        ]
+        if not messages:
+            return
+        try:
+            send_mass_mail(messages, fail_silently=False)
+        except Exception as e:
+            logger.error(f"Payment notification failed for {len(messages)} recipients: {e}")
+
+
+class RefundService:
+    """Service class for refunding payments through Stripe, one at a time or in bulk"""
+
+    @staticmethod
+    def refund_payments(payments, amount=None, reason=None):
+        """
+        Refund payments and return a result dict per payment.
+
+        Stripe calls run on a bounded, rate-limited worker pool with an
+        idempotency key per refund, so a retried run never refunds twice.
+        Successful refunds are then applied with one batched status update and
+        one bulk ledger posting that reverses the points each payment bought.
+        ``amount`` (partial refund) is only meaningful for a single payment.
+        """
+        results = {}
+        eligible = []
+        for payment in payments:
+            if not payment.can_be_refunded:
+                results[payment.id] = {'payment_id': payment.id, 'status': 'skipped', 'error': f'Payment is {payment.status}'}
+            elif not payment.stripe_payment_intent_id:
+                results[payment.id] = {'payment_id': payment.id, 'status': 'skipped', 'error': 'Payment has no Stripe payment intent'}
+            else:
+                eligible.append(payment)
+
+        limiter = RateLimiter(settings.STRIPE_BULK_RATE_LIMIT)
+
+        def refund(payment):
+            refunded = Decimal(str(payment.metadata.get('refunded_amount', '0')))
+            refund_amount = Decimal(str(amount)) if amount is not None else payment.amount - refunded
+            if refund_amount > payment.amount - refunded:
+                raise ValueError(f"Refund amount exceeds the {payment.amount - refunded} left to refund")
+            limiter.wait()
+            stripe_refund = StripeService.create_refund(
+                payment.stripe_payment_intent_id,
+                amount=refund_amount if amount is not None else None,
+                metadata={'payment_id': str(payment.id), 'reason': reason or ''},
+                idempotency_key=f"refund-{payment.id}-{int(refunded * 100)}-{int(refund_amount * 100)}",
+            )
+            return stripe_refund.id, refund_amount
+
+        refunded = {}
+        for payment, outcome, error in bounded_map(refund, eligible, settings.STRIPE_BULK_CONCURRENCY):
+            if error:
+                logger.error(f"Refund failed for payment {payment.id}: {error}")
+                results[payment.id] = {'payment_id': payment.id, 'status': 'failed', 'error': str(error)}
+            else:
+                refunded[payment.id] = outcome
+
+        if refunded:
+            RefundService._apply_refunds(refunded, reason, results)
+        return [results[payment.id] for payment in payments if payment.id in results]
+
+    @staticmethod
+    @transaction.atomic
+    def _apply_refunds(refunded, reason, results):
+        """
+        Record successful Stripe refunds and take back the points they bought.
+
+        Refunded totals are capped at the payment amount under the row lock.
+        Points are taken back with DEDUCT entries that never drive a wallet
+        negative: if some were already spent, what is left is reversed and
+        the shortfall is reported as ``points_unrecovered``.
+        """
+        # Re-read under lock so concurrent refund runs can't reverse the same points twice
+        locked = Payment.objects.select_for_update().filter(
+            pk__in=refunded, status=Payment.PaymentStatus.SUCCEEDED
+        )
+        now = timezone.now()
+        to_update = []
+        reversed_payments = []
+        ledger_entries = []
+        for payment in locked:
+            refund_id, refund_amount = refunded[payment.id]
+            already_refunded = Decimal(str(payment.metadata.get('refunded_amount', '0')))
+            if already_refunded + refund_amount > payment.amount:
+                logger.error(
+                    f"Refund {refund_id} of {refund_amount} exceeds what is left of payment {payment.id}; "
+                    f"recording {payment.amount - already_refunded}"
+                )
+                refund_amount = max(payment.amount - already_refunded, Decimal('0'))
+            total_refunded = already_refunded + refund_amount
+            payment.metadata = {
+                **payment.metadata,
+                'refunded_amount': str(total_refunded),
+                'refund_ids': payment.metadata.get('refund_ids', []) + [refund_id],
+                'refund_reason': reason or '',
+            }
+            if total_refunded >= payment.amount:
+                payment.status = Payment.PaymentStatus.REFUNDED
+            payment.updated_at = now
+            to_update.append(payment)
+
+            results[payment.id] = {
+                'payment_id': payment.id, 'status': 'refunded',
+                'refund_id': refund_id, 'amount': str(refund_amount),
+            }
+            if payment.payment_type == Payment.PaymentType.POINTS_PURCHASE and payment.points_amount:
+                balance_amount = BalanceService.convert_payment_to_balance(
+                    payment.amount, payment.points_amount
+                )
+                reversed_payments.append(payment.id)
+                ledger_entries.append((
+                    payment.user_id,
+                    (balance_amount * refund_amount / payment.amount).quantize(Decimal('0.01')),
+                    f"refund_payment_{payment.id}",
+                ))
+
+        Payment.objects.bulk_update(to_update, ['status', 'metadata', 'updated_at'])
+        deducted = BalanceService.bulk_deduct_balance(ledger_entries)
+        for payment_id, (_, points, _), taken in zip(reversed_payments, ledger_entries, deducted):
+            results[payment_id]['points_reversed'] = str(taken)
+            if taken < points:
+                results[payment_id]['points_unrecovered'] = str(points - taken)
+
+        for payment_id in refunded.keys() - results.keys():
+            results[payment_id] = {'payment_id': payment_id, 'status': 'skipped', 'error': 'Payment changed during refund'}
+
+
+class UsageService:
+    """Service class for metered billing: local usage aggregation and batched reporting"""
+
+    ACTIVE_STATUSES = [Subscription.SubscriptionStatus.ACTIVE, Subscription.SubscriptionStatus.TRIALING]
+
+    @staticmethod
+    def get_metered_subscription(user):
+        """User's active subscription on a metered price, or None"""
+        for subscription in Subscription.objects.filter(user=user, status__in=UsageService.ACTIVE_STATUSES):
+            price = price_catalog.get(subscription.price_id)
+            if price and price.is_metered:
+                return subscription
+        return None
+
+    @staticmethod
+    def record_usage(subscription, quantity=1, price_id=None):
+        """
+        Add usage to the subscription's open aggregate.
+
+        This is a single UPDATE on the hot path; Stripe is only called when
+        `flush_usage` reports the aggregate.
+        """
+        price_id = price_id or subscription.price_id
+        now = timezone.now()
+        open_usage = MeteredUsage.objects.filter(
+            subscription=subscription, price_id=price_id, status=MeteredUsage.UsageStatus.OPEN
+        )
+        if open_usage.update(quantity=F('quantity') + quantity, last_used_at=now):
+            return
+        try:
+            with transaction.atomic():
+                MeteredUsage.objects.create(
+                    subscription=subscription, price_id=price_id, quantity=quantity, last_used_at=now
+                )
+        except IntegrityError:
+            # A concurrent request opened the aggregate first
+            open_usage.update(quantity=F('quantity') + quantity, last_used_at=now)
+
+    @staticmethod
+    def close_open_usage(batch_size=500):
+        """Move open aggregates to flushing; usage recorded after this opens new rows"""
+        with transaction.atomic():
+            ids = list(
+                MeteredUsage.objects.select_for_update(skip_locked=True)
+                .filter(status=MeteredUsage.UsageStatus.OPEN)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if ids:
+                MeteredUsage.objects.filter(id__in=ids).update(status=MeteredUsage.UsageStatus.FLUSHING)
+        return len(ids)
+
+    @staticmethod
+    def report_batch(batch_size=500, after_id=0):
+        """
+        Send one meter event per flushing aggregate with id > ``after_id``.
+
+        Rows stay ``flushing`` until Stripe accepts them, so a crashed or
+        failed run is simply retried; the meter event identifier is derived
+        from the row id and Stripe drops duplicates of it. Returns
+        ``(reported, failed, last_id)``.
+        """
+        rows = list(
+            MeteredUsage.objects.filter(status=MeteredUsage.UsageStatus.FLUSHING, id__gt=after_id)
+            .select_related('subscription').order_by('id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0, after_id
+
+        limiter = RateLimiter(settings.STRIPE_BULK_RATE_LIMIT)
+
+        def report(usage):
+            price = price_catalog.get(usage.price_id)
+            event_name = (price.metadata.get('meter_event_name') if price else None) or settings.STRIPE_METER_EVENT_NAME
+            limiter.wait()
+            StripeService.create_meter_event(
+                event_name, usage.subscription.stripe_customer_id, usage.quantity,
+                usage.identifier, usage.last_used_at,
+            )
+
+        now = timezone.now()
+        reported, failed = [], []
+        for usage, _, error in bounded_map(report, rows, settings.STRIPE_BULK_CONCURRENCY):
+            if error:
+                logger.error(f"Usage report failed for {usage.identifier}: {error}")
+                usage.attempts += 1
+                usage.last_error = str(error)
+                failed.append(usage)
+            else:
+                usage.status = MeteredUsage.UsageStatus.REPORTED
+                usage.reported_at = now
+                usage.last_error = ''
+                reported.append(usage)
+
+        MeteredUsage.objects.bulk_update(reported, ['status', 'reported_at', 'last_error'])
+        MeteredUsage.objects.bulk_update(failed, ['attempts', 'last_error'])
+        return len(reported), len(failed), rows[-1].id
+
+
+class PayoutService:
+    """Service class for paying tool creators their earned revenue"""
+
+    OPEN_STATUSES = [Payout.PayoutStatus.PENDING, Payout.PayoutStatus.PROCESSING]
+    # Errors that won't go away by retrying (e.g. account not enabled for transfers)
+    PERMANENT_ERRORS = (stripe.error.InvalidRequestError, stripe.error.PermissionError)
+
+    @staticmethod
+    def owed_creators(min_amount):
+        """
+        Creators owed at least ``min_amount``, computed in one aggregate query.
+
+        Owed is revenue minus what has been paid out and minus payouts that
+        are still in flight. Rows carry ``id``, ``stripe_account_id`` and ``owed``.
+        """
+        money = DecimalField(max_digits=10, decimal_places=2)
+        in_flight = Coalesce(
+            Sum('payouts__amount', filter=Q(payouts__status__in=PayoutService.OPEN_STATUSES)),
+            Value(0), output_field=money,
+        )
+        return (
+            User.objects.filter(role=User.Role.TOOL_CREATOR, is_active=True, stripe_account_id__isnull=False)
+            .exclude(stripe_account_id='')
+            .annotate(owed=ExpressionWrapper(F('total_revenue') - F('total_payouts') - in_flight, output_field=money))
+            .filter(owed__gte=min_amount)
+            .values('id', 'stripe_account_id', 'owed')
+        )
+
+    @staticmethod
+    def create_payouts(min_amount, batch_size=1000):
+        """
+        Create a pending payout for every creator owed at least ``min_amount``.
+
+        Creators that already have a payout in flight are skipped (both by the
+        owed query and by the one-open-payout-per-user constraint), so
+        repeating a run never pays anyone twice. Returns the number created.
+        """
+        payouts = [
+            Payout(
+                user_id=row['id'], amount=row['owed'], currency=settings.STRIPE_CURRENCY.upper(),
+                stripe_account_id=row['stripe_account_id'],
+            )
+            for row in PayoutService.owed_creators(min_amount).iterator(chunk_size=batch_size)
+        ]
+        created = 0
+        for start in range(0, len(payouts), batch_size):
+            chunk = payouts[start:start + batch_size]
+            Payout.objects.bulk_create(chunk, ignore_conflicts=True)
+            # bulk_create hands back every object, including ones the constraint
+            # dropped; the ids are ours, so count the rows that actually exist
+            created += Payout.objects.filter(pk__in=[payout.pk for payout in chunk]).count()
+        return created
+
+    @staticmethod
+    def claim_batch(batch_size=100):
+        """
+        Move up to ``batch_size`` payouts to processing and return them.
+
+        Also reclaims payouts left processing by a run that died before
+        recording the outcome; their transfers reuse the same idempotency key.
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.PAYOUT_CLAIM_TIMEOUT)
+        with transaction.atomic():
+            payouts = list(
+                Payout.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=Payout.PayoutStatus.PENDING)
+                    | Q(status=Payout.PayoutStatus.PROCESSING, claimed_at__lt=stale_before)
+                )
+                .order_by('created_at')[:batch_size]
+            )
+            if payouts:
+                now = timezone.now()
+                Payout.objects.filter(pk__in=[p.pk for p in payouts]).update(
+                    status=Payout.PayoutStatus.PROCESSING, claimed_at=now
+                )
+                for payout in payouts:
+                    payout.status = Payout.PayoutStatus.PROCESSING
+                    payout.claimed_at = now
+        return payouts
+
+    @staticmethod
+    def execute_batch(batch_size=100):
+        """
+        Claim a batch of payouts and send their transfers.
+
+        Transfers run on a bounded, rate-limited worker pool with an
+        idempotency key per payout. Returns ``(paid, failed, retry)`` counts;
+        0/0/0 means there was nothing left to do.
+        """
+        payouts = PayoutService.claim_batch(batch_size)
+        if not payouts:
+            return 0, 0, 0
+
+        limiter = RateLimiter(settings.STRIPE_BULK_RATE_LIMIT)
+
+        def transfer(payout):
+            limiter.wait()
+            return StripeService.create_transfer(
+                payout.amount, payout.currency, payout.stripe_account_id,
+                metadata={'payout_id': str(payout.id), 'user_id': str(payout.user_id)},
+                idempotency_key=payout.idempotency_key,
+            ).id
+
+        transfers, failed, retry = {}, {}, []
+        for payout, transfer_id, error in bounded_map(transfer, payouts, settings.STRIPE_BULK_CONCURRENCY):
+            if error is None:
+                transfers[payout.pk] = transfer_id
+            elif isinstance(error, PayoutService.PERMANENT_ERRORS):
+                logger.error(f"Payout {payout.id} failed: {error}")
+                failed[payout.pk] = str(error)
+            else:
+                logger.error(f"Payout {payout.id} will be retried: {error}")
+                retry.append(payout.pk)
+
+        paid = PayoutService._record_outcomes(transfers, failed, retry)
+        return paid, len(failed), len(retry)
+
+    @staticmethod
+    @transaction.atomic
+    def _record_outcomes(transfers, failed, retry):
+        # Only payouts still processing are settled, so a reclaimed payout can't be counted twice
+        locked = {
+            payout.pk: payout
+            for payout in Payout.objects.select_for_update().filter(
+                pk__in=[*transfers, *failed, *retry], status=Payout.PayoutStatus.PROCESSING
+            )
+        }
+        now = timezone.now()
+        paid = []
+        for pk, transfer_id in transfers.items():
+            if pk in locked:
+                payout = locked[pk]
+                payout.status = Payout.PayoutStatus.PAID
+                payout.stripe_transfer_id = transfer_id
+                payout.paid_at = now
+                payout.failure_reason = ''
+                paid.append(payout)
+        for pk, reason in failed.items():
+            if pk in locked:
+                locked[pk].status = Payout.PayoutStatus.FAILED
+                locked[pk].failure_reason = reason
+        for pk in retry:
+            if pk in locked:
+                locked[pk].status = Payout.PayoutStatus.PENDING
+
+        Payout.objects.bulk_update(
+            locked.values(), ['status', 'stripe_transfer_id', 'paid_at', 'failure_reason']
+        )
+        if paid:
+            # One UPDATE for every creator paid in this batch
+            paid_total = (
+                Payout.objects.filter(user=OuterRef('pk'), pk__in=[p.pk for p in paid])
+                .values('user').annotate(total=Sum('amount')).values('total')
+            )
+            User.objects.filter(pk__in={p.user_id for p in paid}).update(
+                total_payouts=F('total_payouts') + Subquery(paid_total)
+            )
+        return len(paid)
+
+
+class SubscriptionSyncService:
+    """Service class for reconciling local subscriptions against Stripe in bulk"""
+
+    @staticmethod
+    def map_customers_to_users(customers):
+        """
+        Resolve Stripe customers to user ids without calling Stripe.
+
+        ``customers`` maps customer id -> email (email may be None). Known
+        customer ids are resolved from local rows first, the rest by email.
+        """
+        resolved = {}
+        customer_ids = set(customers)
+        for model in (Subscription, PaymentMethod, Payment):
+            missing = customer_ids - resolved.keys()
+            if not missing:
+                break
+            rows = model.objects.filter(stripe_customer_id__in=missing).values_list('stripe_customer_id', 'user_id')
+            for customer_id, user_id in rows:
+                resolved.setdefault(customer_id, user_id)
+
+        by_email = {customers[c]: c for c in customer_ids - resolved.keys() if customers[c]}
+        if by_email:
+            for user_id, email in User.objects.filter(email__in=by_email).values_list('id', 'email'):
+                resolved[by_email[email]] = user_id
+        return resolved
+
+    @staticmethod
+    def sync_batch(stripe_subscriptions):
+        """
+        Reconcile one page of Stripe subscriptions with local rows.
+
+        Existing rows are read with a single query, and only new or changed
+        subscriptions are written with one batched upsert.
+        Returns a dict of counters.
+        """
+        stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'unmapped': 0}
+        remote = {}
+        customers = {}
+        for obj in stripe_subscriptions:
+            fields = subscription_fields_from_stripe(obj)
+            remote[obj.get('id')] = fields
+            customer = obj.get('customer')
+            email = customer.get('email') if isinstance(customer, dict) else None
+            customers[fields['stripe_customer_id']] = email
+
+        existing = {
+            sub.stripe_subscription_id: sub
+            for sub in Subscription.objects.filter(stripe_subscription_id__in=remote)
+        }
+        user_ids = SubscriptionSyncService.map_customers_to_users(customers)
+
+        to_write = []
+        for sub_id, fields in remote.items():
+            local = existing.get(sub_id)
+            user_id = user_ids.get(fields['stripe_customer_id']) or (local.user_id if local else None)
+            if not user_id:
+                logger.error(f"Unable to map Stripe customer {fields['stripe_customer_id']} to a user for subscription sync")
+                stats['unmapped'] += 1
+                continue
+
+            if local and local.user_id == user_id and all(
+                getattr(local, field) == value for field, value in fields.items()
+            ):
+                stats['unchanged'] += 1
+                continue
+
+            stats['updated' if local else 'created'] += 1
+            to_write.append(Subscription(stripe_subscription_id=sub_id, user_id=user_id, **fields))
+
+        if to_write:
+            Subscription.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=['stripe_subscription_id'],
+                update_fields=SUBSCRIPTION_SYNC_FIELDS + ['updated_at'],
+            )
+        return stats
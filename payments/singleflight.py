@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+import time
+import uuid
+
+import stripe
+from django.conf import settings
+
+from core.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls so only one of them does the work.
+
+    Within a process, callers with the same key wait for the in-flight call
+    and share its result (or exception). Across workers, the leader takes a
+    Redis lock and publishes its encoded result for STRIPE_SINGLEFLIGHT_RESULT_TTL
+    seconds; other workers wait for it instead of calling out themselves. Without
+    Redis (or if it errors) coalescing is per-process only.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, encode=json.dumps, decode=json.loads):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, func, encode, decode)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _do_shared(self, key, func, encode, decode):
+        client = get_redis_client()
+        if client is None:
+            return func()
+
+        import redis
+
+        lock_key = f"singleflight:{self.namespace}:{key}:lock"
+        result_key = f"singleflight:{self.namespace}:{key}:result"
+        lock_timeout = settings.STRIPE_SINGLEFLIGHT_LOCK_TIMEOUT
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_timeout
+
+        while True:
+            try:
+                cached = client.get(result_key)
+                if cached is not None:
+                    return decode(cached)
+                acquired = client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000))
+            except redis.RedisError as e:
+                logger.warning(f"Single-flight lock unavailable for {self.namespace}:{key}: {e}")
+                return func()
+
+            if acquired:
+                break
+            if time.monotonic() >= deadline:
+                # The holder is stuck or gone; don't wait on it forever
+                return func()
+            time.sleep(0.05)
+
+        try:
+            result = func()
+            try:
+                client.set(
+                    result_key, encode(result),
+                    px=int(settings.STRIPE_SINGLEFLIGHT_RESULT_TTL * 1000),
+                )
+            except redis.RedisError as e:
+                logger.warning(f"Could not share single-flight result for {self.namespace}:{key}: {e}")
+            return result
+        finally:
+            try:
+                client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except redis.RedisError:
+                pass
+
+
+stripe_flight = SingleFlight('stripe')
+
+
+def stripe_single_flight(key, func, object_cls):
+    """Single-flight a Stripe call whose result is a ``object_cls`` resource"""
+    return stripe_flight.do(
+        key, func,
+        encode=json.dumps,
+        decode=lambda raw: object_cls.construct_from(json.loads(raw), stripe.api_key),
+    )
@@ -1,3 +1,157 @@
-from django.test import TestCase
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from balance.models import Transaction
+from balance.services import BalanceService
+
+from .models import OutboxEvent, Payment, Payout
+from .services import OutboxRelay, PaymentService, PayoutService, RefundService
+
+User = get_user_model()
+
+
+def create_points_payment(user, amount='10.00', points=1000, **fields):
+    return Payment.objects.create(
+        user=user, amount=Decimal(amount), payment_type=Payment.PaymentType.POINTS_PURCHASE,
+        points_amount=points, stripe_payment_intent_id=f"pi_{Payment.objects.count()}", **fields,
+    )
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class PaymentCompletionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.payment = create_points_payment(self.user)
+
+    def test_racing_completions_complete_once(self):
+        # The success redirect, the confirm call and the webhook each hold a copy read while pending
+        copies = [Payment.objects.get(pk=self.payment.pk) for _ in range(3)]
+
+        completed = [PaymentService.complete_payment(copy) for copy in copies]
+
+        self.assertEqual(completed.count(True), 1)
+        self.assertEqual(OutboxEvent.objects.filter(payment=self.payment).count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.SUCCEEDED)
+
+    def test_failed_confirm_does_not_overwrite_completed_payment(self):
+        PaymentService.complete_payment(Payment.objects.get(pk=self.payment.pk))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        intent = SimpleNamespace(status='requires_payment_method', client_secret='secret')
+        with mock.patch('payments.views.StripeService.confirm_payment_intent', return_value=intent):
+            response = client.post(
+                '/api/payments/confirm/', {'payment_intent_id': self.payment.stripe_payment_intent_id}, format='json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Payment.PaymentStatus.SUCCEEDED)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.SUCCEEDED)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class OutboxRelayTests(TestCase):
+    def test_each_event_is_credited_once(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        payment = create_points_payment(user)
+        PaymentService.complete_payment(payment)
+        PaymentService.complete_payment(payment)
+
+        self.assertEqual(OutboxRelay.relay_batch(), 1)
+        self.assertEqual(OutboxRelay.relay_batch(), 0)
+
+        self.assertEqual(BalanceService.get_balance(user), Decimal('1000'))
+        self.assertEqual(Transaction.objects.filter(wallet__user=user, txn_type=Transaction.DEPOSIT).count(), 1)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class RefundReversalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.payment = create_points_payment(self.user, status=Payment.PaymentStatus.SUCCEEDED)
+        BalanceService.add_balance(self.user, Decimal('1000'), reference=f"payment_{self.payment.id}")
+        patcher = mock.patch(
+            'payments.services.StripeService.create_refund', side_effect=lambda *args, **kwargs: SimpleNamespace(id='re_1'),
+        )
+        self.create_refund = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def deducted(self):
+        return [t.amount for t in Transaction.objects.filter(wallet__user=self.user, txn_type=Transaction.DEDUCT)]
+
+    def test_full_refund_reverses_all_points(self):
+        [result] = RefundService.refund_payments([self.payment])
+
+        self.assertEqual(result['status'], 'refunded')
+        self.assertEqual(result['points_reversed'], '1000.00')
+        self.assertNotIn('points_unrecovered', result)
+        self.assertEqual(BalanceService.get_balance(self.user), Decimal('0'))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.REFUNDED)
+
+    def test_partial_refund_reverses_proportional_points(self):
+        [result] = RefundService.refund_payments([self.payment], amount=Decimal('2.50'))
+
+        self.assertEqual(result['points_reversed'], '250.00')
+        self.assertEqual(self.deducted(), [Decimal('250.00')])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.SUCCEEDED)
+        self.assertEqual(self.payment.metadata['refunded_amount'], '2.50')
+
+    def test_spent_points_are_reversed_without_going_negative(self):
+        BalanceService.deduct_balance(self.user, Decimal('700'))
+
+        [result] = RefundService.refund_payments([self.payment])
+
+        self.assertEqual(result['points_reversed'], '300.00')
+        self.assertEqual(result['points_unrecovered'], '700.00')
+        self.assertEqual(BalanceService.get_balance(self.user), Decimal('0'))
+        self.assertFalse(Transaction.objects.filter(wallet__user=self.user, amount__lt=0).exists())
+
+    def test_partial_refund_beyond_remaining_amount_is_rejected(self):
+        RefundService.refund_payments([self.payment], amount=Decimal('8'))
+        self.payment.refresh_from_db()
+
+        [result] = RefundService.refund_payments([self.payment], amount=Decimal('9'))
+
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(self.create_refund.call_count, 1)
+        self.assertEqual(self.deducted(), [Decimal('800.00')])
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class PayoutRunTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(
+            email='creator@example.com', username='creator', password='secret',
+            role=User.Role.TOOL_CREATOR, total_revenue=Decimal('50.00'), stripe_account_id='acct_1',
+        )
+        patcher = mock.patch(
+            'payments.services.StripeService.create_transfer', side_effect=lambda *args, **kwargs: SimpleNamespace(id='tr_1'),
+        )
+        self.create_transfer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_create_does_not_open_a_second_payout(self):
+        self.assertEqual(PayoutService.create_payouts(Decimal('10')), 1)
+        self.assertEqual(PayoutService.create_payouts(Decimal('10')), 0)
+        self.assertEqual(Payout.objects.filter(user=self.creator).count(), 1)
+
+    def test_rerunning_payouts_does_not_pay_twice(self):
+        PayoutService.create_payouts(Decimal('10'))
+        self.assertEqual(PayoutService.execute_batch(), (1, 0, 0))
+
+        self.assertEqual(PayoutService.create_payouts(Decimal('10')), 0)
+        self.assertEqual(PayoutService.execute_batch(), (0, 0, 0))
+
+        self.assertEqual(self.create_transfer.call_count, 1)
+        self.creator.refresh_from_db()
+        self.assertEqual(self.creator.total_payouts, Decimal('50.00'))
+        self.assertEqual(Payout.objects.get(user=self.creator).status, Payout.PayoutStatus.PAID)
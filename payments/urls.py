@@ -2,7 +2,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CreatePaymentIntentView, ConfirmPaymentView, PaymentMethodViewSet,
-    PaymentHistoryView, SubscriptionViewSet, create_checkout_session, stripe_webhook, success_payment
+    PaymentHistoryView, SubscriptionViewSet, RefundPaymentView, BulkRefundView, PriceListView,
+    RecordUsageView,
+    create_checkout_session, stripe_health, stripe_webhook, success_payment
 )
 
 router = DefaultRouter()
@@ -14,14 +16,21 @@ urlpatterns = [
     path('create-intent/', CreatePaymentIntentView.as_view(), name='create-payment-intent'),
     path('confirm/', ConfirmPaymentView.as_view(), name='confirm-payment'),
     
+    # Refunds (admin)
+    path('refund/', RefundPaymentView.as_view(), name='refund-payment'),
+    path('refund/bulk/', BulkRefundView.as_view(), name='bulk-refund-payments'),
+    
     # Payment history
     path('history/', PaymentHistoryView.as_view(), name='payment-history'),
+    path('prices/', PriceListView.as_view(), name='price-list'),
+    path('usage/', RecordUsageView.as_view(), name='record-usage'),
     path('create-checkout-session/', create_checkout_session, name='create-checkout-session'),
     path('success', success_payment, name='success-payment'),
 
     
     # Stripe webhook
     path('webhook/', stripe_webhook, name='stripe-webhook'),
+    path('stripe/health/', stripe_health, name='stripe-health'),
     
     # Payment methods
     path('', include(router.urls)),
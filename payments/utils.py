@@ -1,9 +1,21 @@
+import hashlib
+import json
 import stripe
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import connections
 
-# Configure Stripe
+from .resilience import call_stripe
+from .singleflight import stripe_single_flight
+
+# Configure Stripe; keep timeouts short so a slow Stripe can't pin request workers
 stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+stripe.default_http_client = stripe.RequestsClient(timeout=settings.STRIPE_TIMEOUT)
 
 logger = logging.getLogger(__name__)
 
@@ -13,24 +25,61 @@ class StripeService:
     
     @staticmethod
     def get_or_create_customer(user):
-        """Get or create Stripe customer for user"""
-        try:
+        """
+        Get or create Stripe customer for user.
+        
+        Concurrent calls for the same user (double-clicked checkout, parallel
+        tabs) share one lookup, and creation is idempotent per user, so they
+        can't produce duplicate customers.
+        """
+        def lookup():
             # Try to find existing customer
-            customers = stripe.Customer.list(email=user.email, limit=1)
+            customers = call_stripe('customer.list', stripe.Customer.list, email=user.email, limit=1, hedge=True)
             if customers.data:
                 return customers.data[0]
             
-            # Create new customer
-            customer = stripe.Customer.create(
-                email=user.email,
-                name=f"{user.first_name} {user.last_name}".strip(),
-                metadata={'user_id': str(user.id)}
+            # Create new customer. Stripe rejects a reused idempotency key with
+            # different parameters for 24h, so the key covers them: a user who
+            # changes their name or email gets a fresh key, not an error.
+            params = {
+                'email': user.email,
+                'name': f"{user.first_name} {user.last_name}".strip(),
+                'metadata': {'user_id': str(user.id)},
+            }
+            fingerprint = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            return call_stripe(
+                'customer.create', stripe.Customer.create,
+                idempotency_key=f"customer-create-{user.id}-{fingerprint}",
+                **params
             )
-            return customer
+        
+        try:
+            return stripe_single_flight(f"customer:user:{user.id}", lookup, stripe.Customer)
         except stripe.error.StripeError as e:
             logger.error(f"Stripe customer error: {e}")
             raise
     
+    @staticmethod
+    def get_customer_id(user):
+        """
+        Stripe customer id for user, resolved from local rows when possible.
+        
+        Only falls back to the Stripe API when the user has never paid or
+        saved a payment method.
+        """
+        from .models import Payment, PaymentMethod, Subscription
+        
+        for model in (PaymentMethod, Subscription, Payment):
+            customer_id = (
+                model.objects.filter(user=user, stripe_customer_id__isnull=False)
+                .exclude(stripe_customer_id='')
+                .values_list('stripe_customer_id', flat=True)
+                .first()
+            )
+            if customer_id:
+                return customer_id
+        return StripeService.get_or_create_customer(user).id
+    
     @staticmethod
     def create_payment_intent(amount, currency, customer_id, payment_method_id=None, metadata=None):
         """Create Stripe payment intent"""
@@ -48,7 +97,7 @@ class StripeService:
                 intent_data['confirmation_method'] = 'manual'
                 intent_data['confirm'] = True
             
-            return stripe.PaymentIntent.create(**intent_data)
+            return call_stripe('payment_intent.create', stripe.PaymentIntent.create, **intent_data)
         except stripe.error.StripeError as e:
             logger.error(f"Stripe payment intent error: {e}")
             raise
@@ -61,7 +110,140 @@ class StripeService:
             if payment_method_id:
                 confirm_data['payment_method'] = payment_method_id
             
-            return stripe.PaymentIntent.confirm(payment_intent_id, **confirm_data)
+            return call_stripe('payment_intent.confirm', stripe.PaymentIntent.confirm, payment_intent_id, **confirm_data)
         except stripe.error.StripeError as e:
             logger.error(f"Stripe payment confirmation error: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    def attach_payment_method(payment_method_id, customer_id):
+        """Attach a payment method to a customer; the response includes card details"""
+        try:
+            return call_stripe('payment_method.attach', stripe.PaymentMethod.attach, payment_method_id, customer=customer_id)
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe payment method attach error: {e}")
+            raise
+    
+    @staticmethod
+    def create_checkout_session(**session_data):
+        """Create Stripe Checkout session"""
+        try:
+            return call_stripe('checkout_session.create', stripe.checkout.Session.create, **session_data)
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe checkout session error: {e}")
+            raise
+    
+    @staticmethod
+    def retrieve_subscription(subscription_id):
+        """Retrieve Stripe subscription (idempotent read, hedged and coalesced)"""
+        return stripe_single_flight(
+            f"subscription:{subscription_id}",
+            lambda: call_stripe('subscription.retrieve', stripe.Subscription.retrieve, subscription_id, hedge=True),
+            stripe.Subscription,
+        )
+    
+    @staticmethod
+    def retrieve_customer(customer_id):
+        """Retrieve Stripe customer (idempotent read, hedged and coalesced)"""
+        return stripe_single_flight(
+            f"customer:{customer_id}",
+            lambda: call_stripe('customer.retrieve', stripe.Customer.retrieve, customer_id, hedge=True),
+            stripe.Customer,
+        )
+    
+    @staticmethod
+    def create_meter_event(event_name, customer_id, value, identifier, timestamp):
+        """Report usage for a customer to a Stripe billing meter"""
+        try:
+            return call_stripe(
+                'meter_event.create', stripe.billing.MeterEvent.create,
+                event_name=event_name,
+                payload={'stripe_customer_id': customer_id, 'value': str(value)},
+                identifier=identifier,
+                timestamp=int(timestamp.timestamp()),
+                idempotency_key=identifier
+            )
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe meter event error: {e}")
+            raise
+    
+    @staticmethod
+    def create_transfer(amount, currency, destination, metadata=None, idempotency_key=None):
+        """Transfer funds to a connected account"""
+        try:
+            return call_stripe(
+                'transfer.create', stripe.Transfer.create,
+                amount=int(amount * 100),  # Convert to cents
+                currency=currency.lower(),
+                destination=destination,
+                metadata=metadata or {},
+                idempotency_key=idempotency_key
+            )
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe transfer error: {e}")
+            raise
+    
+    @staticmethod
+    def create_refund(payment_intent_id, amount=None, metadata=None, idempotency_key=None):
+        """Refund a Stripe payment intent (fully, or partially when amount is given)"""
+        try:
+            refund_data = {
+                'payment_intent': payment_intent_id,
+                'metadata': metadata or {},
+            }
+            if amount is not None:
+                refund_data['amount'] = int(amount * 100)  # Convert to cents
+            
+            return call_stripe('refund.create', stripe.Refund.create, idempotency_key=idempotency_key, **refund_data)
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe refund error: {e}")
+            raise
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls to at most ``rate`` per second"""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_at)
+            self._next_at = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def _call_and_release(func, item):
+    try:
+        return func(item), None
+    except Exception as e:
+        return None, e
+    finally:
+        # Worker threads own their DB connections; don't leak them
+        connections.close_all()
+
+
+def bounded_map(func, items, max_workers=4):
+    """Run func over items on a bounded thread pool.
+
+    At most ``max_workers`` calls are in flight at once and results are
+    yielded as ``(item, result, error)`` tuples in input order, so callers
+    can checkpoint progress safely.
+    """
+    max_workers = max(1, int(max_workers))
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(_call_and_release, func, item)))
+            if len(pending) >= max_workers:
+                done_item, future = pending.popleft()
+                yield (done_item, *future.result())
+        while pending:
+            done_item, future = pending.popleft()
+            yield (done_item, *future.result())
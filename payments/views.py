@@ -1,26 +1,36 @@
 import stripe
 import logging
 import json
+from decimal import Decimal
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.http import JsonResponse, HttpResponseRedirect
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from rest_framework import generics, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExample
-from datetime import datetime
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExample, OpenApiParameter
 
-from .models import Payment, PaymentMethod, PaymentWebhook, Subscription
+from .models import Payment, PaymentMethod, PaymentWebhook, StripePrice, StripeProduct, Subscription
 from .serializers import (
     CreatePaymentIntentSerializer, ConfirmPaymentSerializer,
-    PaymentMethodSerializer, SetupPaymentMethodSerializer, PaymentHistorySerializer, SubscriptionSerializer
+    PaymentMethodSerializer, SetupPaymentMethodSerializer, PaymentHistorySerializer, SubscriptionSerializer,
+    RefundPaymentSerializer, BulkRefundPaymentSerializer, PriceSerializer, RecordUsageSerializer
 )
+from .catalog import price_catalog, upsert_prices, upsert_products
+from .services import (
+    PaymentMethodSyncService, PaymentService, RefundService, UsageService, subscription_fields_from_stripe
+)
+from .resilience import CircuitOpenError, breaker_snapshot
 from .utils import StripeService
-from balance.services import BalanceService
+from core.idempotency import idempotent
+from core.throttling import TokenBucketThrottle
+from core.pagination import CursorPaginationOptionMixin
+from users.permissions import CanManageRefunds, IsAdmin
 
 # Configure Stripe
 
@@ -28,13 +38,9 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-def _safe_ts_to_dt(timestamp_value):
-    if not timestamp_value:
-        return None
-    try:
-        return timezone.make_aware(datetime.utcfromtimestamp(int(timestamp_value)))
-    except Exception:
-        return None
+class PaymentsThrottle(TokenBucketThrottle):
+    """``payments`` rate limit for function views"""
+    scope = 'payments'
 
 
 def _get_user_by_stripe_customer(customer_id):
@@ -47,7 +53,7 @@ def _get_user_by_stripe_customer(customer_id):
     if payment:
         return payment.user
     try:
-        customer = stripe.Customer.retrieve(customer_id)
+        customer = StripeService.retrieve_customer(customer_id)
         email = getattr(customer, 'email', None) or (customer.get('email') if isinstance(customer, dict) else None)
         if email:
             return User.objects.filter(email=email).first()
@@ -57,64 +63,39 @@ def _get_user_by_stripe_customer(customer_id):
 
 
 def _upsert_subscription_from_stripe_object(stripe_subscription_obj):
-    customer_id = stripe_subscription_obj.get('customer') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'customer', None)
+    defaults = subscription_fields_from_stripe(stripe_subscription_obj)
+    customer_id = defaults['stripe_customer_id']
     user = _get_user_by_stripe_customer(customer_id)
     if not user:
         logger.error(f"Unable to map Stripe customer {customer_id} to a user for subscription sync")
         return None
 
-    # Pull primary item for price/quantity
-    items = (stripe_subscription_obj.get('items', {}) if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'items', {})) or {}
-    items_data = items.get('data') if isinstance(items, dict) else getattr(items, 'data', [])
-    primary_item = items_data[0] if items_data else None
-    price_id = None
-    quantity = 1
-    if primary_item:
-        price = primary_item.get('price') if isinstance(primary_item, dict) else getattr(primary_item, 'price', None)
-        price_id = (price.get('id') if isinstance(price, dict) else getattr(price, 'id', None)) if price else None
-        quantity = primary_item.get('quantity') if isinstance(primary_item, dict) else getattr(primary_item, 'quantity', 1)
-
-    sub_id = stripe_subscription_obj.get('id') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'id', None)
-    status = stripe_subscription_obj.get('status') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'status', None)
-    cancel_at_period_end = stripe_subscription_obj.get('cancel_at_period_end') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'cancel_at_period_end', False)
-    current_period_start = stripe_subscription_obj.get('current_period_start') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'current_period_start', None)
-    current_period_end = stripe_subscription_obj.get('current_period_end') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'current_period_end', None)
-    trial_end = stripe_subscription_obj.get('trial_end') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'trial_end', None)
-    canceled_at = stripe_subscription_obj.get('canceled_at') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'canceled_at', None)
-    metadata = stripe_subscription_obj.get('metadata') if isinstance(stripe_subscription_obj, dict) else getattr(stripe_subscription_obj, 'metadata', {})
-
-    defaults = {
-        'user': user,
-        'stripe_customer_id': customer_id,
-        'status': status or Subscription.SubscriptionStatus.INCOMPLETE,
-        'price_id': price_id or '',
-        'quantity': quantity or 1,
-        'current_period_start': _safe_ts_to_dt(current_period_start),
-        'current_period_end': _safe_ts_to_dt(current_period_end),
-        'trial_end': _safe_ts_to_dt(trial_end),
-        'cancel_at_period_end': bool(cancel_at_period_end),
-        'canceled_at': _safe_ts_to_dt(canceled_at),
-        'metadata': metadata or {},
-    }
+    defaults['user'] = user
 
     subscription, created = Subscription.objects.get_or_create(
-        stripe_subscription_id=sub_id,
+        stripe_subscription_id=stripe_subscription_obj.get('id'),
         defaults=defaults,
     )
 
     if not created:
         for field, value in defaults.items():
             setattr(subscription, field, value)
-        if subscription.user_id != user.id:
-            subscription.user = user
         subscription.save()
 
     return subscription
+
+
 @extend_schema_view(
     post=extend_schema(
         summary="Create payment intent",
         description="Create a new payment intent for processing payments",
         tags=["Payments"],
+        parameters=[
+            OpenApiParameter(
+                'Idempotency-Key', str, OpenApiParameter.HEADER, required=False,
+                description="Repeats with the same key replay the first response instead of creating another payment"
+            )
+        ],
         examples=[
             OpenApiExample(
                 "Points Purchase",
@@ -132,7 +113,9 @@ class CreatePaymentIntentView(generics.CreateAPIView):
     """Create payment intent for processing payments"""
     serializer_class = CreatePaymentIntentSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
     
+    @method_decorator(idempotent)
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -178,6 +161,8 @@ class CreatePaymentIntentView(generics.CreateAPIView):
                 'currency': payment.currency
             }, status=status.HTTP_201_CREATED)
             
+        except CircuitOpenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except stripe.error.StripeError as e:
             return Response({
                 'error': f'Stripe error: {str(e)}'
@@ -200,6 +185,7 @@ class ConfirmPaymentView(generics.CreateAPIView):
     """Confirm payment intent"""
     serializer_class = ConfirmPaymentSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -225,28 +211,23 @@ class ConfirmPaymentView(generics.CreateAPIView):
                 payment_intent_id, payment_method_id
             )
             
-            # Update payment status
+            # Update payment status; the balance credit is applied by the outbox relay
             if payment_intent.status == 'succeeded':
-                payment.status = Payment.PaymentStatus.SUCCEEDED
-                payment.completed_at = timezone.now()
-                
-                # Add balance to user if it's a points purchase
-                if payment.payment_type == Payment.PaymentType.POINTS_PURCHASE and payment.points_amount:
-                    balance_amount = BalanceService.convert_payment_to_balance(
-                        payment.amount, payment.points_amount
-                    )
-                    BalanceService.add_balance(
-                        user=request.user,
-                        amount=balance_amount,
-                        reference=f"payment_{payment.id}",
-                        description=f"Points purchase: {payment.description}"
-                    )
-            elif payment_intent.status == 'requires_action':
-                payment.status = Payment.PaymentStatus.PROCESSING
+                PaymentService.complete_payment(payment)
             else:
-                payment.status = Payment.PaymentStatus.FAILED
-            
-            payment.save()
+                # Conditional, like complete_payment: the webhook or success
+                # redirect may have completed the payment since it was read
+                Payment.objects.filter(
+                    pk=payment.pk,
+                    status__in=[Payment.PaymentStatus.PENDING, Payment.PaymentStatus.PROCESSING],
+                ).update(
+                    status=(
+                        Payment.PaymentStatus.PROCESSING if payment_intent.status == 'requires_action'
+                        else Payment.PaymentStatus.FAILED
+                    ),
+                    updated_at=timezone.now(),
+                )
+            payment.refresh_from_db(fields=['status', 'completed_at'])
             
             return Response({
                 'payment_id': payment.id,
@@ -256,6 +237,8 @@ class ConfirmPaymentView(generics.CreateAPIView):
                 'client_secret': payment_intent.client_secret if payment_intent.status == 'requires_action' else None
             })
             
+        except CircuitOpenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except stripe.error.StripeError as e:
             return Response({
                 'error': f'Stripe error: {str(e)}'
@@ -267,6 +250,96 @@ class ConfirmPaymentView(generics.CreateAPIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema_view(
+    post=extend_schema(
+        summary="Refund payment",
+        description="Refund a payment in full, or partially when amount is given (admin only)",
+        tags=["Refunds"]
+    )
+)
+class RefundPaymentView(generics.CreateAPIView):
+    """Refund a single payment"""
+    serializer_class = RefundPaymentSerializer
+    permission_classes = [CanManageRefunds]
+    throttle_scope = 'payments'
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            payment = Payment.objects.get(id=serializer.validated_data['payment_id'])
+        except Payment.DoesNotExist:
+            return Response({
+                'error': 'Payment not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        amount = serializer.validated_data.get('amount')
+        refundable = payment.amount - Decimal(str(payment.metadata.get('refunded_amount', '0')))
+        if amount is not None and amount > refundable:
+            return Response({
+                'error': f'Refund amount exceeds the {refundable} left to refund'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            [result] = RefundService.refund_payments(
+                [payment], amount=amount, reason=serializer.validated_data.get('reason')
+            )
+        except Exception as e:
+            logger.error(f"Refund error for payment {payment.id}: {e}")
+            return Response({
+                'error': 'Failed to refund payment'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if result['status'] != 'refunded':
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
+@extend_schema_view(
+    post=extend_schema(
+        summary="Bulk refund payments",
+        description="Refund up to STRIPE_BULK_REFUND_MAX (default 100) payments in full; Stripe calls run "
+                    "on a bounded, rate-limited worker pool (admin only)",
+        tags=["Refunds"]
+    )
+)
+class BulkRefundView(generics.CreateAPIView):
+    """Refund many payments at once"""
+    serializer_class = BulkRefundPaymentSerializer
+    permission_classes = [CanManageRefunds]
+    throttle_scope = 'payments'
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        payment_ids = serializer.validated_data['payment_ids']
+        payments = list(Payment.objects.filter(id__in=payment_ids))
+        found = {payment.id for payment in payments}
+        
+        try:
+            results = RefundService.refund_payments(
+                payments, reason=serializer.validated_data.get('reason')
+            )
+        except Exception as e:
+            logger.error(f"Bulk refund error: {e}")
+            return Response({
+                'error': 'Failed to refund payments'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        results += [
+            {'payment_id': payment_id, 'status': 'skipped', 'error': 'Payment not found'}
+            for payment_id in payment_ids if payment_id not in found
+        ]
+        return Response({
+            'refunded': sum(1 for result in results if result['status'] == 'refunded'),
+            'failed': sum(1 for result in results if result['status'] == 'failed'),
+            'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+            'results': results,
+        })
+
+
 @extend_schema_view(
     list=extend_schema(
         summary="List payment methods",
@@ -283,6 +356,7 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
     """ViewSet for managing payment methods"""
     serializer_class = PaymentMethodSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'payments'
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -297,37 +371,25 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         try:
-            # Get or create Stripe customer
-            customer = StripeService.get_or_create_customer(request.user)
+            # Resolve the Stripe customer locally when we already know it
+            customer_id = StripeService.get_customer_id(request.user)
             
-            # Attach payment method to customer
+            # Attach payment method to customer; the response carries the card details
             payment_method_id = serializer.validated_data['payment_method_id']
-            stripe.PaymentMethod.attach(
-                payment_method_id,
-                customer=customer.id
-            )
+            payment_method = StripeService.attach_payment_method(payment_method_id, customer_id)
             
-            # Get payment method details
-            payment_method = stripe.PaymentMethod.retrieve(payment_method_id)
-            
-            # Create payment method record
-            pm = PaymentMethod.objects.create(
+            # Create (or refresh, if the attach webhook got here first) the payment method record
+            pm = PaymentMethodSyncService.upsert(
+                payment_method,
                 user=request.user,
-                stripe_payment_method_id=payment_method_id,
-                stripe_customer_id=customer.id,
-                card_brand=payment_method.card.brand,
-                card_last4=payment_method.card.last4,
-                card_exp_month=payment_method.card.exp_month,
-                card_exp_year=payment_method.card.exp_year,
-                is_default=serializer.validated_data.get('set_as_default', False)
+                customer_id=customer_id,
+                set_as_default=serializer.validated_data.get('set_as_default', False)
             )
             
-            # Set as default if requested
-            if pm.is_default:
-                PaymentMethod.objects.filter(user=request.user).exclude(id=pm.id).update(is_default=False)
-            
             return Response(PaymentMethodSerializer(pm).data, status=status.HTTP_201_CREATED)
             
+        except CircuitOpenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except stripe.error.StripeError as e:
             print(str(e))
             return Response({
@@ -356,14 +418,24 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+CURSOR_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        'pagination', str, OpenApiParameter.QUERY, required=False, enum=['cursor'],
+        description="Use cursor pagination: constant-time pages with next/previous links and no count"
+    ),
+    OpenApiParameter('cursor', str, OpenApiParameter.QUERY, required=False, description="Cursor from a next/previous link"),
+]
+
+
 @extend_schema_view(
-    list=extend_schema(
+    get=extend_schema(
         summary="Payment history",
         description="Get user's payment history",
-        tags=["Payments"]
+        tags=["Payments"],
+        parameters=CURSOR_PAGINATION_PARAMETERS
     )
 )
-class PaymentHistoryView(generics.ListAPIView):
+class PaymentHistoryView(CursorPaginationOptionMixin, generics.ListAPIView):
     """View for payment history"""
     serializer_class = PaymentHistorySerializer
     permission_classes = [IsAuthenticated]
@@ -376,13 +448,14 @@ class PaymentHistoryView(generics.ListAPIView):
     list=extend_schema(
         summary="List subscriptions for current user",
         tags=["Subscriptions"],
+        parameters=CURSOR_PAGINATION_PARAMETERS,
     ),
     retrieve=extend_schema(
         summary="Get subscription detail",
         tags=["Subscriptions"],
     ),
 )
-class SubscriptionViewSet(viewsets.ReadOnlyModelViewSet):
+class SubscriptionViewSet(CursorPaginationOptionMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -390,9 +463,64 @@ class SubscriptionViewSet(viewsets.ReadOnlyModelViewSet):
         return Subscription.objects.filter(user=self.request.user)
 
 
+@extend_schema_view(
+    get=extend_schema(
+        summary="List prices",
+        description="Active plans and prices, served from the local price catalog",
+        tags=["Prices"]
+    )
+)
+class PriceListView(generics.ListAPIView):
+    """List active prices from the local catalog"""
+    serializer_class = PriceSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    
+    def get_queryset(self):
+        return price_catalog.all()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['catalog'] = price_catalog
+        return context
+
+
+@extend_schema_view(
+    post=extend_schema(
+        summary="Record metered usage",
+        description="Add usage to the caller's metered subscription; it is aggregated locally and reported to Stripe by `flush_usage`",
+        tags=["Subscriptions"]
+    )
+)
+class RecordUsageView(generics.CreateAPIView):
+    """Record usage against the user's metered subscription"""
+    serializer_class = RecordUsageSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        subscription = UsageService.get_metered_subscription(request.user)
+        if not subscription:
+            return Response({
+                'error': 'No active metered subscription'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        quantity = serializer.validated_data['quantity']
+        UsageService.record_usage(subscription, quantity)
+        return Response({
+            'subscription_id': subscription.stripe_subscription_id,
+            'price_id': subscription.price_id,
+            'quantity': quantity
+        }, status=status.HTTP_202_ACCEPTED)
+
+
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([PaymentsThrottle])
+@idempotent
 def create_checkout_session(request):
     data = request.data
 
@@ -406,19 +534,27 @@ def create_checkout_session(request):
             quantity = int(data.get('quantity', 1))
             if not price_id:
                 return JsonResponse({"error": "price_id is required for subscription checkout"}, status=400)
-
-            session = stripe.checkout.Session.create(
-                line_items=[{
-                    'price': price_id,
-                    'quantity': quantity,
-                }],
+            if quantity < 1:
+                return JsonResponse({"error": "quantity must be at least 1"}, status=400)
+
+            # Validate against the local catalog before making any Stripe call
+            price = price_catalog.get(price_id)
+            product = price_catalog.get_product(price.stripe_product_id) if price else None
+            if not price or not price.is_recurring or (product and not product.active):
+                return JsonResponse({"error": "price_id is not an active recurring price"}, status=400)
+
+            # Metered prices are billed on reported usage, so Stripe rejects a quantity for them
+            line_item = {'price': price_id} if price.is_metered else {'price': price_id, 'quantity': quantity}
+            session = StripeService.create_checkout_session(
+                line_items=[line_item],
                 mode='subscription',
                 success_url='http://localhost:3000/subscription?success=true',
                 cancel_url='http://localhost:3000/subscription',
                 customer_email=getattr(user, 'email', None) or None,
             )
 
-            return JsonResponse({"url": session.url}, status=status.HTTP_201_CREATED)
+            plan = PriceSerializer(price, context={'catalog': price_catalog}).data
+            return JsonResponse({"url": session.url, "plan": plan}, status=status.HTTP_201_CREATED)
 
         # One-time payment for points purchase (default)
         amount = data.get("amount")
@@ -429,10 +565,10 @@ def create_checkout_session(request):
         if not amount or float(amount) < 0.5:
             return JsonResponse({"error": "Amount is required and must be >= 0.5"}, status=400)
 
-        # Build success URL with user_id (handled by success_payment view)
-        success_url = f"http://localhost:8000/api/payments/success?user_id={user.id}"
+        # Stripe substitutes the session id, which success_payment uses to find the payment
+        success_url = "http://localhost:8000/api/payments/success?session_id={CHECKOUT_SESSION_ID}"
 
-        session = stripe.checkout.Session.create(
+        session = StripeService.create_checkout_session(
             line_items=[{
                 'price_data': {
                     'currency': 'usd',
@@ -446,6 +582,7 @@ def create_checkout_session(request):
             mode='payment',
             success_url=success_url,
             cancel_url='http://localhost:3000/subscription',
+            client_reference_id=str(user.id),
         )
 
         # Record Payment in DB (status: pending)
@@ -458,6 +595,7 @@ def create_checkout_session(request):
             description=description,
             points_amount=points_amount,
             stripe_payment_intent_id=None,
+            stripe_checkout_session_id=session.id,
             stripe_payment_method_id=None,
             stripe_customer_id=None,
             metadata=session.metadata,
@@ -465,6 +603,8 @@ def create_checkout_session(request):
 
         return JsonResponse({"url": session.url}, status=status.HTTP_201_CREATED)
 
+    except CircuitOpenError as e:
+        return JsonResponse({"error": str(e)}, status=503)
     except stripe.error.StripeError as e:
         return JsonResponse({"error": f"Stripe error: {str(e)}"}, status=400)
 
@@ -473,53 +613,44 @@ def create_checkout_session(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def success_payment(request):
-    user_id = request.GET.get('user_id')
+    session_id = request.GET.get('session_id')
 
-    if not user_id:
-        return JsonResponse({'error': 'user_id is required in query params'}, status=400)
+    if not session_id:
+        return JsonResponse({'error': 'session_id is required in query params'}, status=400)
 
+    # Single indexed lookup; safe when the same user has several checkouts in flight
     try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        return JsonResponse({'error': 'User not found'}, status=404)
-
-    # Find the latest pending payment for this user (assuming only one in progress)
-    payment = Payment.objects.filter(
-        user=user,
-        status=Payment.PaymentStatus.PENDING  # or PROCESSING if you want to include that state
-    ).order_by('-created_at').first()
-
-    if not payment:
-        return JsonResponse({'error': 'No pending payment found for this user'}, status=404)
+        payment = Payment.objects.select_related('user').get(stripe_checkout_session_id=session_id)
+    except Payment.DoesNotExist:
+        return JsonResponse({'error': 'Payment not found for this checkout session'}, status=404)
 
     # Mark the payment as succeeded (for demo purposes - in production, use Stripe webhook!)
-    payment.status = Payment.PaymentStatus.SUCCEEDED
-    payment.completed_at = timezone.now()
-    payment.save(update_fields=['status', 'completed_at'])
-
-    # Auto-credit user's wallet for points purchases
+    # Points purchases are credited to the wallet by the outbox relay
     try:
-        if payment.payment_type == Payment.PaymentType.POINTS_PURCHASE and payment.points_amount:
-            balance_amount = BalanceService.convert_payment_to_balance(
-                payment.amount, payment.points_amount
-            )
-            BalanceService.add_balance(
-                user=payment.user,
-                amount=balance_amount,
-                reference=f"payment_{payment.id}",
-                description=f"Points purchase: {payment.description or ''}"
-            )
+        PaymentService.complete_payment(payment)
     except Exception as e:
-        logger.error(f"Auto-credit on success_payment failed for payment {payment.id}: {e}")
+        logger.error(f"Completing payment {payment.id} on success_payment failed: {e}")
 
     # Optionally, return payment info
     url = f"http://localhost:3000/subscription?success=true"
     return HttpResponseRedirect(url)
 
 
+@extend_schema(
+    summary="Stripe circuit breaker status",
+    description="State and trip counts of the Stripe circuit breakers in the worker serving this request (admin only)",
+    tags=["Payments"]
+)
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def stripe_health(request):
+    return Response({'breakers': breaker_snapshot()})
+
+
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([])  # Stripe retries and its event volume is not ours to limit
 def stripe_webhook(request):
     """Handle Stripe webhooks"""
     payload = request.body
@@ -558,21 +689,8 @@ def stripe_webhook(request):
                 payment = Payment.objects.get(
                     stripe_payment_intent_id=payment_intent['id']
                 )
-                payment.status = Payment.PaymentStatus.SUCCEEDED
-                payment.completed_at = timezone.now()
-                payment.save()
-                
-                # Add balance if it's a points purchase
-                if payment.payment_type == Payment.PaymentType.POINTS_PURCHASE and payment.points_amount:
-                    balance_amount = BalanceService.convert_payment_to_balance(
-                        payment.amount, payment.points_amount
-                    )
-                    BalanceService.add_balance(
-                        user=payment.user,
-                        amount=balance_amount,
-                        reference=f"payment_{payment.id}",
-                        description=f"Points purchase: {payment.description}"
-                    )
+                # Queues the balance credit in the outbox along with the status change
+                PaymentService.complete_payment(payment)
                 
                 webhook.payment = payment
                 
@@ -598,16 +716,64 @@ def stripe_webhook(request):
         elif event['type'] == 'checkout.session.completed':
             session = event['data']['object']
             mode = session.get('mode') if isinstance(session, dict) else getattr(session, 'mode', None)
-            if mode == 'subscription':
+            if mode == 'payment':
+                try:
+                    payment = Payment.objects.select_related('user').get(
+                        stripe_checkout_session_id=session['id']
+                    )
+                    if session.get('payment_status') == 'paid':
+                        stripe_fields = {}
+                        if session.get('payment_intent') and not payment.stripe_payment_intent_id:
+                            stripe_fields['stripe_payment_intent_id'] = session['payment_intent']
+                        if session.get('customer') and not payment.stripe_customer_id:
+                            stripe_fields['stripe_customer_id'] = session['customer']
+                        PaymentService.complete_payment(payment, **stripe_fields)
+                    webhook.payment = payment
+                except Payment.DoesNotExist:
+                    logger.error(f"Payment not found for checkout session: {session['id']}")
+            elif mode == 'subscription':
                 customer_id = session.get('customer') if isinstance(session, dict) else getattr(session, 'customer', None)
                 sub_id = session.get('subscription') if isinstance(session, dict) else getattr(session, 'subscription', None)
                 try:
                     if sub_id:
-                        stripe_subscription = stripe.Subscription.retrieve(sub_id)
+                        stripe_subscription = StripeService.retrieve_subscription(sub_id)
                         _upsert_subscription_from_stripe_object(stripe_subscription)
                 except Exception as inner_e:
                     logger.error(f"Subscribe checkout completion handling error: {inner_e}")
 
+        # Payment method lifecycle events (cards changed in the Stripe dashboard)
+        elif event['type'] == 'payment_method.attached':
+            payment_method = event['data']['object']
+            customer_id = payment_method.get('customer')
+            user = _get_user_by_stripe_customer(customer_id)
+            if user:
+                PaymentMethodSyncService.upsert(payment_method, user=user, customer_id=customer_id)
+            else:
+                logger.error(f"Unable to map Stripe customer {customer_id} to a user for payment method sync")
+
+        elif event['type'] in ('payment_method.updated', 'payment_method.automatically_updated'):
+            PaymentMethodSyncService.update_details(event['data']['object'])
+
+        elif event['type'] == 'payment_method.detached':
+            PaymentMethodSyncService.deactivate(event['data']['object']['id'])
+
+        # Price catalog events
+        elif event['type'] in ('price.created', 'price.updated'):
+            upsert_prices([event['data']['object']])
+            price_catalog.invalidate()
+
+        elif event['type'] == 'price.deleted':
+            StripePrice.objects.filter(stripe_price_id=event['data']['object']['id']).update(active=False)
+            price_catalog.invalidate()
+
+        elif event['type'] in ('product.created', 'product.updated'):
+            upsert_products([event['data']['object']])
+            price_catalog.invalidate()
+
+        elif event['type'] == 'product.deleted':
+            StripeProduct.objects.filter(stripe_product_id=event['data']['object']['id']).update(active=False)
+            price_catalog.invalidate()
+
         elif event['type'].startswith('customer.subscription.'):
             stripe_subscription = event['data']['object']
             _upsert_subscription_from_stripe_object(stripe_subscription)
@@ -617,7 +783,7 @@ def stripe_webhook(request):
             sub_id = invoice.get('subscription') if isinstance(invoice, dict) else getattr(invoice, 'subscription', None)
             if sub_id:
                 try:
-                    stripe_subscription = stripe.Subscription.retrieve(sub_id)
+                    stripe_subscription = StripeService.retrieve_subscription(sub_id)
                     _upsert_subscription_from_stripe_object(stripe_subscription)
                 except Exception as inner_e:
                     logger.error(f"Invoice subscription sync error: {inner_e}")
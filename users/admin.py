@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User, UserProfile
+from .models import ApiKey, User, UserProfile
 
 
 class UserProfileInline(admin.StackedInline):
@@ -27,7 +27,7 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions'),
         }),
         (_('Points & Revenue'), {
-            'fields': ('points_balance', 'api_key', 'total_revenue', 'total_payouts'),
+            'fields': ('points_balance', 'api_key', 'total_revenue', 'total_payouts', 'stripe_account_id'),
         }),
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
     )
@@ -47,4 +47,26 @@ class UserAdmin(BaseUserAdmin):
         return qs.filter(id=request.user.id)
 
 
-admin.site.register(User, UserAdmin) 
\ No newline at end of file
+admin.site.register(User, UserAdmin) 
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    list_display = ('prefix', 'name', 'user', 'created_at', 'revoked_at')
+    list_filter = ('revoked_at', 'created_at')
+    search_fields = ('prefix', 'name', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('prefix', 'hashed_secret', 'created_at', 'revoked_at')
+    actions = ['revoke_keys']
+    
+    def has_add_permission(self, request):
+        # Keys are issued through the API so the secret is shown to its owner
+        return False
+    
+    @admin.action(description=_('Revoke selected API keys'))
+    def revoke_keys(self, request, queryset):
+        from .api_keys import ApiKeyService
+        
+        for api_key in queryset.filter(revoked_at__isnull=True):
+            ApiKeyService.revoke(api_key)
+
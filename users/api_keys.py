@@ -0,0 +1,143 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ApiKey, TokenUser
+from .revocation import revocation_store
+
+KEY_PREFIX = 'tk'
+
+
+def hash_secret(secret):
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+
+def parse_key(raw_key):
+    """``(prefix, secret)`` from ``tk_<prefix>_<secret>``, or None if malformed"""
+    parts = raw_key.split('_', 2)
+    if len(parts) != 3 or parts[0] != KEY_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1], parts[2]
+
+
+class ApiKeyCache:
+    """
+    Per-worker LRU of verified keys, keyed by prefix.
+
+    Entries expire after API_KEY_CACHE_TTL seconds, which bounds how long a
+    worker keeps honouring a key after the user is deactivated. Revocation is
+    faster: it is announced through the revocation store and checked on every
+    hit.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prefix):
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is None:
+                return None
+            if entry['expires_at'] < time.monotonic():
+                del self._entries[prefix]
+                return None
+            self._entries.move_to_end(prefix)
+            return entry
+
+    def set(self, prefix, entry):
+        entry['expires_at'] = time.monotonic() + settings.API_KEY_CACHE_TTL
+        with self._lock:
+            self._entries[prefix] = entry
+            self._entries.move_to_end(prefix)
+            while len(self._entries) > settings.API_KEY_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix):
+        with self._lock:
+            self._entries.pop(prefix, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+api_key_cache = ApiKeyCache()
+
+
+class ApiKeyService:
+    """Service class for issuing, verifying and revoking API keys"""
+
+    @staticmethod
+    def issue(user, name=''):
+        """Create a key for ``user``; returns the row and the raw key, which is never stored"""
+        while True:
+            prefix = secrets.token_hex(4)
+            if not ApiKey.objects.filter(prefix=prefix).exists():
+                break
+        secret = secrets.token_urlsafe(32)
+        api_key = ApiKey.objects.create(user=user, name=name, prefix=prefix, hashed_secret=hash_secret(secret))
+        return api_key, f"{KEY_PREFIX}_{prefix}_{secret}"
+
+    @staticmethod
+    def revoke(api_key):
+        if api_key.revoked_at is None:
+            api_key.revoked_at = timezone.now()
+            api_key.save(update_fields=['revoked_at'])
+        api_key_cache.invalidate(api_key.prefix)
+        revocation_store.revoke_api_key(api_key.prefix)
+        return api_key
+
+    @staticmethod
+    def verify(raw_key):
+        """
+        Cache entry for a valid key, or None.
+
+        A cache hit costs a hash and a revocation check (normally answered by
+        the local Bloom filter); a miss is one indexed lookup by prefix.
+        """
+        parsed = parse_key(raw_key)
+        if parsed is None:
+            return None
+        prefix, secret = parsed
+        hashed = hash_secret(secret)
+
+        entry = api_key_cache.get(prefix)
+        if entry is not None and revocation_store.is_api_key_revoked(prefix):
+            api_key_cache.invalidate(prefix)
+            entry = None
+        if entry is None:
+            entry = ApiKeyService._load(prefix)
+            if entry is None:
+                return None
+            api_key_cache.set(prefix, entry)
+
+        if not secrets.compare_digest(hashed, entry['hashed_secret']):
+            return None
+        return entry
+
+    @staticmethod
+    def _load(prefix):
+        try:
+            api_key = ApiKey.objects.select_related('user').get(prefix=prefix, revoked_at__isnull=True)
+        except ApiKey.DoesNotExist:
+            return None
+        user = api_key.user
+        if not user.is_active:
+            return None
+        return {
+            'key_id': api_key.pk,
+            'prefix': prefix,
+            'hashed_secret': api_key.hashed_secret,
+            'user_id': user.pk,
+            'claims': {field: getattr(user, field) for field in TokenUser.CLAIM_FIELDS},
+        }
+
+    @staticmethod
+    def user_for(entry):
+        return TokenUser.from_claims(entry['user_id'], entry['claims'])
@@ -1,9 +1,63 @@
+from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework import authentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework import authentication, exceptions
+
+from .api_keys import ApiKeyService
+from .models import TokenUser
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     def get_user(self, validated_token):
+        if settings.JWT_STATELESS_AUTH:
+            user = self.get_token_user(validated_token)
+            if user is not None:
+                return user
         user = super().get_user(validated_token)
         # Custom validation logic, e.g., check if role matches expected
         # For now, just return the user; extend as needed
         return user
+    
+    def get_token_user(self, validated_token):
+        """
+        Build the user from token claims instead of loading the row.
+        
+        Tokens without the role/email/username claims fall back to a normal
+        lookup. Refreshing re-reads the claims from the row, so deactivation
+        and role changes take effect once the current access token expires.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            claims = {field: validated_token[field] for field in TokenUser.CLAIM_FIELDS}
+        except KeyError:
+            return None
+        return TokenUser.from_claims(user_id, claims, capabilities=validated_token.get('caps'))
+
+
+class ApiKeyAuthentication(authentication.BaseAuthentication):
+    """
+    ``Authorization: Api-Key tk_<prefix>_<secret>``.
+
+    Authenticates as the key's owner, built from cached claims like a
+    stateless JWT user; ``request.auth`` is the cache entry for the key.
+    """
+    keyword = 'Api-Key'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid API key header.')
+        try:
+            raw_key = header[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid API key header.')
+
+        entry = ApiKeyService.verify(raw_key)
+        if entry is None:
+            raise exceptions.AuthenticationFailed('Invalid or revoked API key.')
+        return ApiKeyService.user_for(entry), entry
+
+    def authenticate_header(self, request):
+        return self.keyword
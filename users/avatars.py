@@ -0,0 +1,164 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Pillow format -> stored extension for originals
+ORIGINAL_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def _prefix(content_hash):
+    return f"avatars/{content_hash[:2]}/{content_hash}"
+
+
+def thumbnail_name(content_hash, size, fmt):
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f"{_prefix(content_hash)}_{size}.{extension}"
+
+
+def thumbnail_urls(content_hash):
+    return {
+        str(size): {fmt: default_storage.url(thumbnail_name(content_hash, size, fmt)) for fmt in THUMBNAIL_FORMATS}
+        for size in settings.AVATAR_THUMBNAIL_SIZES
+    }
+
+
+def _thumbnails_exist(content_hash):
+    return all(
+        default_storage.exists(thumbnail_name(content_hash, size, fmt))
+        for size in settings.AVATAR_THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS
+    )
+
+
+def _flatten(image):
+    """RGB copy for JPEG, with transparency shown as white rather than black"""
+    if image.mode != 'RGBA':
+        return image
+    flat = Image.new('RGB', image.size, 'white')
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.AVATAR_WORKERS, thread_name_prefix='avatars')
+        return _executor
+
+
+class AvatarService:
+    """
+    Content-addressed avatars.
+
+    The upload is hashed as it streams from Django's upload handler and the
+    original is stored once per hash, so identical uploads share files. The
+    request returns straight away; thumbnails in each of
+    AVATAR_THUMBNAIL_SIZES are rendered as WebP and JPEG on a background
+    thread, and the profile's avatar_status turns ``ready`` when they exist.
+    Files are never deleted on replacement since other profiles may share
+    them.
+    """
+
+    @staticmethod
+    def store(profile, uploaded):
+        digest = hashlib.sha256()
+        for chunk in uploaded.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        extension = ORIGINAL_EXTENSIONS[uploaded.image.format]
+        name = f"{_prefix(content_hash)}.{extension}"
+        if not default_storage.exists(name):
+            # Temporary uploads are moved into place rather than copied
+            name = default_storage.save(name, uploaded)
+
+        ready = _thumbnails_exist(content_hash)
+        profile.avatar.name = name
+        profile.avatar_hash = content_hash
+        profile.avatar_status = UserProfile.AvatarStatus.READY if ready else UserProfile.AvatarStatus.PROCESSING
+        profile.save(update_fields=['avatar', 'avatar_hash', 'avatar_status', 'updated_at'])
+
+        if not ready:
+            transaction.on_commit(lambda: AvatarService.schedule(content_hash, name))
+        return profile
+
+    @staticmethod
+    def schedule(content_hash, name):
+        _get_executor().submit(AvatarService._process_in_background, content_hash, name)
+
+    @staticmethod
+    def _process_in_background(content_hash, name):
+        try:
+            AvatarService.process(content_hash, name)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def process(content_hash, name):
+        """Render the thumbnails for ``name`` and mark profiles still on this avatar ready"""
+        try:
+            AvatarService.render_thumbnails(content_hash, name)
+            status = UserProfile.AvatarStatus.READY
+        except Exception as e:
+            logger.error(f"Error generating avatar thumbnails for {name}: {str(e)}")
+            status = UserProfile.AvatarStatus.FAILED
+
+        # Every profile waiting on this content, not just the uploader's
+        UserProfile.objects.filter(
+            avatar_hash=content_hash, avatar_status=UserProfile.AvatarStatus.PROCESSING,
+        ).update(avatar_status=status)
+        return status
+
+    @staticmethod
+    def render_thumbnails(content_hash, name):
+        sizes = sorted(settings.AVATAR_THUMBNAIL_SIZES, reverse=True)
+        with default_storage.open(name, 'rb') as f, Image.open(f) as image:
+            # Let JPEG decode at reduced scale when the original is much larger
+            image.draft('RGB', (sizes[0], sizes[0]))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+            for size in sizes:
+                # Each size is cut from the previous one, which is cheaper than the original
+                image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                for fmt, (pil_format, options) in THUMBNAIL_FORMATS.items():
+                    target = thumbnail_name(content_hash, size, fmt)
+                    if default_storage.exists(target):
+                        continue
+                    rendered = _flatten(image) if pil_format == 'JPEG' else image
+                    buffer = io.BytesIO()
+                    rendered.save(buffer, pil_format, **options)
+                    default_storage.save(target, ContentFile(buffer.getvalue()))
+
+    @staticmethod
+    def process_pending():
+        """Re-run thumbnails for avatars left processing (e.g. the worker restarted)"""
+        pending = (
+            UserProfile.objects.filter(avatar_status=UserProfile.AvatarStatus.PROCESSING)
+            .values_list('avatar_hash', 'avatar').distinct()
+        )
+        done = {}
+        for content_hash, name in pending:
+            if content_hash not in done:
+                done[content_hash] = AvatarService.process(content_hash, name)
+        return done
@@ -0,0 +1,45 @@
+"""
+Role capabilities as a bitmask.
+
+Each role compiles to one integer that is put in access tokens as the
+``caps`` claim, so permission checks here and in downstream services are a
+single bit test. Bit positions are part of the token format: never reuse or
+renumber them, only add new ones.
+
+Kept free of Django imports so other services can vendor this module.
+"""
+from enum import IntFlag
+
+
+class Capability(IntFlag):
+    BROWSE_CONTENT = 1 << 0
+    USE_SERVICES = 1 << 1
+    SUBMIT_CONTENT = 1 << 2
+    MANAGE_API_KEYS = 1 << 3
+    TRACK_USAGE_REVENUE = 1 << 4
+    RECEIVE_PAYOUTS = 1 << 5
+    MANAGE_USERS = 1 << 6
+    MANAGE_CONTENT = 1 << 7
+    MANAGE_PAYOUTS = 1 << 8
+    MANAGE_REFUNDS = 1 << 9
+    MANAGE_SUPPORT = 1 << 10
+    MANAGE_SITE_CONTENT = 1 << 11
+
+
+_CREATOR_TOOLS = Capability.SUBMIT_CONTENT | Capability.MANAGE_API_KEYS | Capability.TRACK_USAGE_REVENUE
+
+ROLE_CAPABILITIES = {
+    'CLIENT': Capability.BROWSE_CONTENT | Capability.USE_SERVICES,
+    'TOOL_CREATOR': (
+        Capability.BROWSE_CONTENT | Capability.USE_SERVICES | _CREATOR_TOOLS | Capability.RECEIVE_PAYOUTS
+    ),
+    'ADMIN': (
+        Capability.BROWSE_CONTENT | Capability.USE_SERVICES | _CREATOR_TOOLS
+        | Capability.MANAGE_USERS | Capability.MANAGE_CONTENT | Capability.MANAGE_PAYOUTS
+        | Capability.MANAGE_REFUNDS | Capability.MANAGE_SUPPORT | Capability.MANAGE_SITE_CONTENT
+    ),
+}
+
+
+def capabilities_for_role(role):
+    return ROLE_CAPABILITIES.get(role, Capability(0))
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, make_password
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class HashPool:
+    """
+    Bounded process pool for password key derivation.
+
+    At most PASSWORD_HASH_WORKERS processes hash at once per web worker and at
+    most PASSWORD_HASH_MAX_PENDING jobs may be queued for them; past that the
+    caller hashes inline rather than queueing without limit. The pool is
+    created lazily per process (so it is never inherited across a fork) and
+    rebuilt if a child dies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._slots = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                workers = settings.PASSWORD_HASH_WORKERS
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('forkserver'),
+                )
+                self._pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING or workers * 4)
+            return self._executor, self._slots
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, func, /, *args):
+        if not settings.PASSWORD_HASH_WORKERS:
+            return func(*args)
+
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            return func(*args)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            logger.error("Password hashing pool broke; rebuilding it and hashing inline")
+            self._discard(executor)
+            return func(*args)
+        finally:
+            slots.release()
+
+
+hash_pool = HashPool()
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the derivation run in ``hash_pool`` and the work factor
+    taken from PASSWORD_HASH_ITERATIONS.
+
+    The algorithm name and hash format are Django's own, so existing hashes
+    verify unchanged, and changing the iteration count re-hashes each
+    password on its owner's next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = hash_pool.run(
+            hashlib.pbkdf2_hmac, self.digest().name, force_bytes(password), force_bytes(salt), iterations,
+        )
+        return self.format(salt, iterations, hash)
+
+    def format(self, salt, iterations, hash):
+        hash = base64.b64encode(hash).decode('ascii').strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
+
+
+def make_passwords(passwords, executor, chunksize=16):
+    """
+    Hash many passwords at once, deriving them in ``executor`` (a process
+    pool owned by the caller). Matches ``make_password`` output, including
+    unusable passwords for ``None``; hashers other than the pooled PBKDF2
+    one are run inline.
+    """
+    hasher = get_hasher()
+    if not isinstance(hasher, PooledPBKDF2PasswordHasher):
+        return [make_password(password) for password in passwords]
+
+    usable = [password for password in passwords if password is not None]
+    salts = [hasher.salt() for _ in usable]
+    iterations = hasher.iterations
+    hashes = executor.map(
+        hashlib.pbkdf2_hmac,
+        repeat(hasher.digest().name),
+        [force_bytes(password) for password in usable],
+        [force_bytes(salt) for salt in salts],
+        repeat(iterations),
+        chunksize=chunksize,
+    )
+    encoded = iter([hasher.format(salt, iterations, hash) for salt, hash in zip(salts, hashes)])
+    return [make_password(None) if password is None else next(encoded) for password in passwords]
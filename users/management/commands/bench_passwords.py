@@ -0,0 +1,67 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.core.management.base import BaseCommand, CommandError
+
+from users.hashing import PooledPBKDF2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = "Measure password verification (login) throughput per core and through the hashing pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 work factor to test (default: PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--count', type=int, default=20, help='Verifications per measurement')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Concurrent logins through the pool (default: 2 per pool worker)')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        count = max(options['count'], 1)
+        workers = settings.PASSWORD_HASH_WORKERS
+        concurrency = options['concurrency'] or max(workers, 1) * 2
+
+        hasher = get_hasher()
+        password = 'correct horse battery staple'
+        encoded = hasher.encode(password, hasher.salt(), iterations)
+        # Logins verify with whichever hasher claims the algorithm, not the default
+        verifier = identify_hasher(encoded)
+        if not isinstance(verifier, PooledPBKDF2PasswordHasher):
+            raise CommandError(
+                f"Passwords are verified by {type(verifier).__module__}.{type(verifier).__name__}, "
+                f"not the pooled hasher; check PASSWORD_HASHERS"
+            )
+        if not verifier.verify(password, encoded):
+            raise CommandError("Hashed password did not verify")
+
+        decoded = hasher.decode(encoded)
+        started = time.perf_counter()
+        for _ in range(count):
+            hashlib.pbkdf2_hmac(hasher.digest().name, password.encode(), decoded['salt'].encode(), iterations)
+        inline = count / (time.perf_counter() - started)
+
+        self.stdout.write(f"Hasher: {hasher.algorithm}, {iterations} iterations")
+        self.stdout.write(f"Single core: {inline:.1f} logins/s ({1000 / inline:.0f} ms per password check)")
+
+        if not workers:
+            self.stdout.write("PASSWORD_HASH_WORKERS is 0; hashing runs in the request thread")
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Warm the pool so process start-up isn't measured
+            list(executor.map(lambda _: verifier.verify(password, encoded), range(workers)))
+            started = time.perf_counter()
+            results = list(executor.map(lambda _: verifier.verify(password, encoded), range(count * workers)))
+            pooled = len(results) / (time.perf_counter() - started)
+
+        if not all(results):
+            raise CommandError("A pooled password check failed")
+        self.stdout.write(
+            f"Pool ({workers} workers, {concurrency} concurrent logins): {pooled:.1f} logins/s, "
+            f"{pooled / min(workers, os.cpu_count() or 1):.1f} per core"
+        )
@@ -0,0 +1,51 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from users.serializers import ClientRegistrationSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure registration throughput (validate, create user/profile/wallet, issue tokens) and queries per signup"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=50, help='Registrations to run')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 work factor for the run (default: PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users instead of deleting them')
+
+    def handle(self, *args, **options):
+        count = max(options['count'], 1)
+        iterations = options['iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i in range(count):
+                serializer = ClientRegistrationSerializer(data={
+                    'email': f"{prefix}-{i}@example.com",
+                    'username': f"{prefix}-{i}",
+                    'password': 'benchmark-password',
+                    'password_confirm': 'benchmark-password',
+                })
+                if not serializer.is_valid():
+                    raise CommandError(f"Registration failed: {serializer.errors}")
+                serializer.save()
+                if 'access' not in serializer.data['tokens']:
+                    raise CommandError("Registration response has no access token")
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{count} registrations at {iterations} PBKDF2 iterations in {elapsed:.2f}s")
+        self.stdout.write(f"{count / elapsed:.1f} registrations/s, {elapsed / count * 1000:.0f} ms each")
+        self.stdout.write(f"{len(queries) / count:.1f} queries per registration")
+
+        if not options['keep']:
+            deleted, _ = User.objects.filter(username__startswith=f"{prefix}-").delete()
+            self.stdout.write(f"Deleted {deleted} benchmark rows")
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jwt_keys import ALGORITHMS, KeyRing
+from users.tokens import AccessToken, KeyRingTokenBackend
+
+
+class Command(BaseCommand):
+    help = "Compare JWT issue and verify throughput across signing algorithms (keys are generated per run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Tokens issued and verified per algorithm')
+        parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=ALGORITHMS)
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+
+        # Same claims an access token for a typical user carries
+        token = AccessToken()
+        token[settings.SIMPLE_JWT['USER_ID_CLAIM']] = 1
+        token['role'] = 'user'
+        token['email'] = 'bench@example.com'
+        token['username'] = 'bench'
+        payload = token.payload
+
+        self.stdout.write(f"{'algorithm':<10} {'issue/s':>12} {'verify/s':>12} {'token bytes':>12}")
+        for algorithm in options['algorithms']:
+            backend = KeyRingTokenBackend(KeyRing.generate(algorithm))
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                encoded = backend.encode(payload)
+            issue_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                backend.decode(encoded)
+            verify_seconds = time.perf_counter() - started
+
+            if backend.decode(encoded)['jti'] != payload['jti']:
+                raise CommandError(f"{algorithm} round trip returned a different token")
+
+            self.stdout.write(
+                f"{algorithm:<10} {iterations / issue_seconds:>12.0f} {iterations / verify_seconds:>12.0f} "
+                f"{len(encoded):>12}"
+            )
+
+        self.stdout.write(f"Active signing key: {settings.JWT_KEY_RING.active.kid} ({settings.JWT_KEY_RING.active.algorithm})")
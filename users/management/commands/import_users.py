@@ -0,0 +1,163 @@
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from balance.models import Wallet
+from users.hashing import make_passwords
+from users.models import UserProfile
+
+User = get_user_model()
+
+USER_FIELDS = ('first_name', 'last_name', 'phone_number', 'company_name', 'bio')
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import users with their profiles and wallets from CSV or JSONL. Columns: email (required), "
+        "username, password or password_hash (an existing Django-format hash, stored as is), role, "
+        "first_name, last_name, phone_number, company_name, bio. Rows whose email or username already "
+        "exists are skipped, so an interrupted import can simply be re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default=None,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users written per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Password hashing processes')
+        parser.add_argument('--dry-run', action='store_true', help='Validate rows without writing')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = options['format'] or ('jsonl' if path.suffix in ('.jsonl', '.ndjson') else 'csv')
+        batch_size = max(options['batch_size'], 1)
+
+        self.created = self.skipped = self.invalid = self.failed = 0
+        self.seen_emails = set()
+        self.seen_usernames = set()
+
+        with path.open(newline='', encoding='utf-8') as f, ProcessPoolExecutor(
+            max_workers=max(options['workers'], 1), mp_context=multiprocessing.get_context('forkserver'),
+        ) as executor:
+            rows = self._read(f, fmt)
+            line = 1
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch, line, executor, options['dry_run'])
+                line += len(batch)
+                self.stdout.write(f"Processed {line - 1} rows: {self.created} created, {self.skipped} skipped")
+
+        message = (
+            f"{'Would create' if options['dry_run'] else 'Created'} {self.created} users; "
+            f"{self.skipped} already existed, {self.invalid} invalid, {self.failed} failed"
+        )
+        if self.invalid or self.failed:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def _read(self, f, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {'_error': f"invalid JSON on line {number}: {e}"}
+
+    def _clean(self, row):
+        if '_error' in row:
+            raise ValidationError(row['_error'])
+
+        email = User.objects.normalize_email((row.get('email') or '').strip())
+        validate_email(email)
+        username = User.normalize_username((row.get('username') or '').strip() or email)
+        role = (row.get('role') or User.Role.CLIENT).strip().upper()
+        if role not in User.Role.values:
+            raise ValidationError(f"unknown role {role!r}")
+
+        password_hash = (row.get('password_hash') or '').strip()
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise ValidationError("password_hash is not a recognised Django password hash")
+
+        user = User(
+            email=email,
+            username=username[:150],
+            role=role,
+            password=password_hash,
+            **{field: row[field] for field in USER_FIELDS if row.get(field)},
+        )
+        return user, None if password_hash else (row.get('password') or None)
+
+    def _import_batch(self, batch, first_line, executor, dry_run):
+        users, passwords = [], []
+        for offset, row in enumerate(batch):
+            try:
+                user, password = self._clean(row)
+            except ValidationError as e:
+                self.invalid += 1
+                self.stderr.write(f"Row {first_line + offset}: {'; '.join(e.messages)}")
+                continue
+            if user.email in self.seen_emails or user.username in self.seen_usernames:
+                self.skipped += 1
+                continue
+            self.seen_emails.add(user.email)
+            self.seen_usernames.add(user.username)
+            users.append(user)
+            passwords.append(password)
+
+        existing_emails = set(
+            User.objects.filter(email__in=[user.email for user in users]).values_list('email', flat=True)
+        )
+        existing_usernames = set(
+            User.objects.filter(username__in=[user.username for user in users]).values_list('username', flat=True)
+        )
+        new = [
+            (user, password) for user, password in zip(users, passwords)
+            if user.email not in existing_emails and user.username not in existing_usernames
+        ]
+        self.skipped += len(users) - len(new)
+        if not new or dry_run:
+            self.created += len(new)
+            return
+
+        # Users with a password_hash keep it; the rest are hashed in the pool
+        to_hash = [(user, password) for user, password in new if not user.password]
+        for (user, _), encoded in zip(to_hash, make_passwords([password for _, password in to_hash], executor)):
+            user.password = encoded
+
+        users = [user for user, _ in new]
+        try:
+            with transaction.atomic():
+                # bulk_create sends no post_save, so profiles and wallets are created here too
+                User.objects.bulk_create(users)
+                UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+                Wallet.objects.bulk_create([Wallet(user=user) for user in users])
+        except IntegrityError as e:
+            # Most likely a concurrent signup took one of the emails; a re-run skips it
+            self.failed += len(users)
+            self.stderr.write(f"Rows {first_line}-{first_line + len(batch) - 1} not imported: {e}")
+            return
+        self.created += len(users)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.avatars import AvatarService
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for avatars still marked processing (e.g. after a worker restart)"
+
+    def handle(self, *args, **options):
+        results = AvatarService.process_pending()
+        failed = sum(1 for status in results.values() if status == UserProfile.AvatarStatus.FAILED)
+        message = f"Processed {len(results)} avatars; {failed} failed"
+        if failed:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_remove_user_avatar_userprofile_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='stripe_account_id',
+            field=models.CharField(blank=True, help_text='Stripe Connect account that receives payouts', max_length=255, null=True),
+        ),
+    ]
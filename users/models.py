@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .capabilities import Capability, capabilities_for_role
+
 
 def user_avatar_upload_path(instance, filename):
     return f"avatars/user_{instance.user.id}/{filename}"
@@ -42,6 +44,7 @@ class User(AbstractUser):
     api_key = models.CharField(max_length=255, blank=True, null=True, help_text=_('API key for tool creators'))
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text=_('Total revenue earned'))
     total_payouts = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text=_('Total payouts received'))
+    stripe_account_id = models.CharField(max_length=255, blank=True, null=True, help_text=_('Stripe Connect account that receives payouts'))
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -71,61 +74,138 @@ class User(AbstractUser):
     def is_admin(self):
         return self.role == self.Role.ADMIN
     
+    @property
+    def capabilities(self):
+        """Capability mask for the user's role (the ``caps`` token claim)"""
+        return capabilities_for_role(self.role)
+    
+    def has_capability(self, capability):
+        return capability in self.capabilities
+    
     def can_browse_content(self):
         """Check if user can browse content (all roles can)"""
-        return True
+        return self.has_capability(Capability.BROWSE_CONTENT)
     
     def can_use_services(self):
         """Check if user can use services (clients need points)"""
+        if not self.has_capability(Capability.USE_SERVICES):
+            return False
         if self.is_client:
             return self.points_balance > 0
         return True
     
     def can_submit_content(self):
         """Check if user can submit content"""
-        return self.is_tool_creator or self.is_admin
+        return self.has_capability(Capability.SUBMIT_CONTENT)
     
     def can_manage_api_keys(self):
         """Check if user can manage API keys"""
-        return self.is_tool_creator or self.is_admin
+        return self.has_capability(Capability.MANAGE_API_KEYS)
     
     def can_track_usage_revenue(self):
         """Check if user can track usage and revenue"""
-        return self.is_tool_creator or self.is_admin
+        return self.has_capability(Capability.TRACK_USAGE_REVENUE)
     
     def can_receive_payouts(self):
         """Check if user can receive payouts"""
-        return self.is_tool_creator
+        return self.has_capability(Capability.RECEIVE_PAYOUTS)
     
     def can_manage_users(self):
         """Check if user can manage other users"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_USERS)
     
     def can_manage_content(self):
         """Check if user can manage content"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_CONTENT)
     
     def can_manage_payouts(self):
         """Check if user can manage payouts"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_PAYOUTS)
     
     def can_manage_refunds(self):
         """Check if user can manage refunds"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_REFUNDS)
     
     def can_manage_support(self):
         """Check if user can manage support"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_SUPPORT)
     
     def can_manage_site_content(self):
         """Check if user can manage site content"""
-        return self.is_admin
+        return self.has_capability(Capability.MANAGE_SITE_CONTENT)
+
+
+class TokenUser(User):
+    """
+    User built from access-token claims without touching the database.
+
+    Only the claimed fields (id, role, email, username) are populated; every
+    other field is deferred, and reading any of them loads all the deferred
+    fields in a single query. Claims are never written back on save(), since
+    they may be older than the row.
+    """
+    
+    CLAIM_FIELDS = ('role', 'email', 'username')
+    
+    class Meta:
+        proxy = True
+    
+    @classmethod
+    def from_claims(cls, user_id, claims, capabilities=None):
+        values = {'id': user_id, **{field: claims[field] for field in cls.CLAIM_FIELDS}}
+        # from_db expects values in model field order
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in values]
+        user = cls.from_db('default', field_names, [values[name] for name in field_names])
+        user._token_claims = {field: claims[field] for field in cls.CLAIM_FIELDS}
+        user._capabilities = Capability(capabilities) if capabilities is not None else None
+        return user
+    
+    @property
+    def capabilities(self):
+        if getattr(self, '_capabilities', None) is not None:
+            return self._capabilities
+        return super().capabilities
+    
+    def _stale_claims(self):
+        claims = getattr(self, '_token_claims', {})
+        return [field for field, value in claims.items() if self.__dict__.get(field) == value]
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred & set(fields):
+            # Load everything not in the token (and re-read unmodified claims) at once
+            fields = list(deferred) + self._stale_claims()
+            self._token_claims = {}
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+    
+    def save(self, *args, **kwargs):
+        if self.get_deferred_fields() and kwargs.get('update_fields') is None:
+            stale = set(self._stale_claims()) | {self._meta.pk.attname}
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if field.attname in self.__dict__ and field.attname not in stale
+            ]
+            if not update_fields:
+                return
+            kwargs['update_fields'] = update_fields + ['updated_at']
+        super().save(*args, **kwargs)
 
 
 class UserProfile(models.Model):
     """Extended user profile for additional information"""
+    
+    class AvatarStatus(models.TextChoices):
+        NONE = '', _('None')
+        PROCESSING = 'processing', _('Processing')
+        READY = 'ready', _('Ready')
+        FAILED = 'failed', _('Failed')
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     avatar = models.ImageField(upload_to=user_avatar_upload_path, blank=True, null=True)
+    # Avatars are stored by content hash (see users.avatars); thumbnails are
+    # generated in the background and their names derive from the hash
+    avatar_hash = models.CharField(max_length=64, blank=True, default='')
+    avatar_status = models.CharField(max_length=20, choices=AvatarStatus.choices, blank=True, default=AvatarStatus.NONE)
     
     # Additional profile fields
     website = models.URLField(blank=True, null=True)
@@ -144,4 +224,39 @@ class UserProfile(models.Model):
         verbose_name_plural = _('user profiles')
     
     def __str__(self):
-        return f"{self.user.email} Profile" 
\ No newline at end of file
+        return f"{self.user.email} Profile"
+    
+    def avatar_thumbnail_urls(self):
+        """``{size: {format: url}}`` once thumbnails are ready, else empty"""
+        if self.avatar_status != self.AvatarStatus.READY:
+            return {}
+        from .avatars import thumbnail_urls
+        return thumbnail_urls(self.avatar_hash) 
+
+
+class ApiKey(models.Model):
+    """
+    API key for machine-to-machine calls, shown once as ``tk_<prefix>_<secret>``.
+
+    Only the prefix (unique, used for lookup) and a SHA-256 of the secret are
+    stored. The secret is 256 random bits, so a fast hash is enough and keeps
+    verification in microseconds.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_keys')
+    name = models.CharField(max_length=100, blank=True)
+    prefix = models.CharField(max_length=16, unique=True)
+    hashed_secret = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = _('API key')
+        verbose_name_plural = _('API keys')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user.email} tk_{self.prefix}"
+    
+    @property
+    def is_active(self):
+        return self.revoked_at is None
@@ -1,6 +1,9 @@
 from rest_framework import permissions
 from django.contrib.auth import get_user_model
 
+from .authentication import ApiKeyAuthentication
+from .capabilities import Capability
+
 User = get_user_model()
 
 
@@ -25,6 +28,19 @@ class IsAdmin(permissions.BasePermission):
         return request.user.is_authenticated and request.user.is_admin
 
 
+class IsNotApiKey(permissions.BasePermission):
+    """
+    Deny requests authenticated with an API key.
+    
+    For account endpoints (API keys, logout, profile, admin actions), so a
+    leaked key can't be used to mint replacement keys or take over the account.
+    """
+    message = 'This endpoint requires a user login, not an API key.'
+    
+    def has_permission(self, request, view):
+        return not isinstance(request.successful_authenticator, ApiKeyAuthentication)
+
+
 class IsToolCreatorOrAdmin(permissions.BasePermission):
     """Permission to check if user is a tool creator or admin"""
     
@@ -53,85 +69,76 @@ class IsOwnerOrAdmin(permissions.BasePermission):
         return False
 
 
-class CanBrowseContent(permissions.BasePermission):
-    """Permission to check if user can browse content"""
+class CapabilityPermission(permissions.BasePermission):
+    """
+    Base for the Can* permissions: one bit test against the user's capability
+    mask (the ``caps`` token claim under stateless auth, so no user load).
+    """
+    capability = None
     
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_browse_content()
+        return request.user.is_authenticated and request.user.has_capability(self.capability)
 
 
-class CanUseServices(permissions.BasePermission):
+class CanBrowseContent(CapabilityPermission):
+    """Permission to check if user can browse content"""
+    capability = Capability.BROWSE_CONTENT
+
+
+class CanUseServices(CapabilityPermission):
     """Permission to check if user can use services"""
+    capability = Capability.USE_SERVICES
     
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_use_services()
+        # Clients also need points, which is state rather than a capability
+        return super().has_permission(request, view) and request.user.can_use_services()
 
 
-class CanSubmitContent(permissions.BasePermission):
+class CanSubmitContent(CapabilityPermission):
     """Permission to check if user can submit content"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_submit_content()
+    capability = Capability.SUBMIT_CONTENT
 
 
-class CanManageApiKeys(permissions.BasePermission):
+class CanManageApiKeys(CapabilityPermission):
     """Permission to check if user can manage API keys"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_api_keys()
+    capability = Capability.MANAGE_API_KEYS
 
 
-class CanTrackUsageRevenue(permissions.BasePermission):
+class CanTrackUsageRevenue(CapabilityPermission):
     """Permission to check if user can track usage and revenue"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_track_usage_revenue()
+    capability = Capability.TRACK_USAGE_REVENUE
 
 
-class CanReceivePayouts(permissions.BasePermission):
+class CanReceivePayouts(CapabilityPermission):
     """Permission to check if user can receive payouts"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_receive_payouts()
+    capability = Capability.RECEIVE_PAYOUTS
 
 
-class CanManageUsers(permissions.BasePermission):
+class CanManageUsers(CapabilityPermission):
     """Permission to check if user can manage users"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_users()
+    capability = Capability.MANAGE_USERS
 
 
-class CanManageContent(permissions.BasePermission):
+class CanManageContent(CapabilityPermission):
     """Permission to check if user can manage content"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_content()
+    capability = Capability.MANAGE_CONTENT
 
 
-class CanManagePayouts(permissions.BasePermission):
+class CanManagePayouts(CapabilityPermission):
     """Permission to check if user can manage payouts"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_payouts()
+    capability = Capability.MANAGE_PAYOUTS
 
 
-class CanManageRefunds(permissions.BasePermission):
+class CanManageRefunds(CapabilityPermission):
     """Permission to check if user can manage refunds"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_refunds()
+    capability = Capability.MANAGE_REFUNDS
 
 
-class CanManageSupport(permissions.BasePermission):
+class CanManageSupport(CapabilityPermission):
     """Permission to check if user can manage support"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_support()
+    capability = Capability.MANAGE_SUPPORT
 
 
-class CanManageSiteContent(permissions.BasePermission):
+class CanManageSiteContent(CapabilityPermission):
     """Permission to check if user can manage site content"""
-    
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.can_manage_site_content() 
\ No newline at end of file
+    capability = Capability.MANAGE_SITE_CONTENT
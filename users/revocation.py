@@ -0,0 +1,201 @@
+"""
+Token revocation.
+
+Revoked token ids (``jti:<jti>``), per-user cut-offs (``user:<id>``, which
+revoke every token issued before a moment) and revoked API keys
+(``apikey:<prefix>``, so workers drop cached keys) are stored in Redis under
+``revoked:`` with a TTL matching the longest-lived entry they can affect.
+
+Each worker keeps a Bloom filter of the revoked keys, built by scanning Redis
+and kept current by a listener thread subscribed to REVOCATION_CHANNEL. A
+token none of whose keys are in the filter is not revoked, with no network
+call; a possible match is confirmed against Redis. Until the filter is synced
+(or while the listener is disconnected) every check goes to Redis.
+
+Without REDIS_URL revocations live in the Django cache, which is per-process
+with the default local-memory cache.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+from core.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = 'token-revocations'
+_PREFIX = 'revoked:'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)"""
+
+    def __init__(self, size_bits, hashes):
+        self.size = size_bits
+        self.hashes = hashes
+        self._bits = bytearray((size_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    def __init__(self):
+        self._bloom = None
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    # Writing
+
+    def revoke_token(self, payload):
+        """Revoke one token until it would have expired anyway"""
+        ttl = int(payload['exp'] - time.time()) + 1
+        if ttl > 0:
+            self._revoke(f"jti:{payload[api_settings.JTI_CLAIM]}", '1', ttl)
+
+    def revoke_user(self, user_id):
+        """
+        Revoke every token issued to ``user_id`` before the current second.
+
+        ``iat`` is whole seconds, so tokens from the revocation's own second
+        survive; the alternative would reject a login made straight after it.
+        """
+        ttl = int(max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME).total_seconds()) + 1
+        self._revoke(f"user:{user_id}", str(int(time.time())), ttl)
+
+    def _revoke(self, key, value, ttl):
+        client = get_redis_client()
+        if client is None:
+            cache.set(_PREFIX + key, value, timeout=ttl)
+            return
+        pipe = client.pipeline()
+        pipe.set(_PREFIX + key, value, ex=ttl)
+        pipe.publish(REVOCATION_CHANNEL, key)
+        pipe.execute()
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(key)
+
+    # Checking
+
+    def is_revoked(self, payload):
+        keys = [f"jti:{payload.get(api_settings.JTI_CLAIM)}"]
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            keys.append(f"user:{user_id}")
+        return self._any_revoked(payload, self._lookup(keys))
+
+    def revoke_api_key(self, prefix):
+        """Tell every worker to drop its cached copy of an API key"""
+        self._revoke(f"apikey:{prefix}", '1', settings.API_KEY_CACHE_TTL + 1)
+
+    def is_api_key_revoked(self, prefix):
+        return self._lookup([f"apikey:{prefix}"]).get(f"apikey:{prefix}") is not None
+
+    def _lookup(self, keys):
+        """Stored values of whichever of ``keys`` are revoked"""
+        client = get_redis_client()
+        if client is None:
+            values = cache.get_many([_PREFIX + key for key in keys])
+            return {key: values.get(_PREFIX + key) for key in keys}
+
+        self._ensure_listener()
+        bloom = self._bloom
+        if bloom is not None:
+            keys = [key for key in keys if key in bloom]
+            if not keys:
+                return {}
+
+        import redis
+
+        try:
+            return dict(zip(keys, client.mget([_PREFIX + key for key in keys])))
+        except redis.RedisError as e:
+            if bloom is None:
+                # Nothing to go on; don't lock every user out while Redis is down
+                logger.error(f"Token revocation check unavailable: {e}")
+                return {}
+            logger.warning(f"Could not confirm possible token revocation, rejecting: {e}")
+            return {key: 'inf' for key in keys}
+
+    @staticmethod
+    def _any_revoked(payload, values):
+        for key, value in values.items():
+            if value is None:
+                continue
+            if key.startswith('jti:'):
+                return True
+            issued_at = payload.get('iat')
+            if issued_at is None or issued_at < float(value):
+                return True
+        return False
+
+    # Keeping the filter in sync
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            # A forked child must not trust the parent's filter or thread
+            self._bloom = None
+            self._listener_pid = os.getpid()
+            threading.Thread(target=self._listen, name='token-revocations', daemon=True).start()
+
+    def _build(self, client):
+        bloom = BloomFilter(settings.REVOCATION_BLOOM_BITS, settings.REVOCATION_BLOOM_HASHES)
+        for key in client.scan_iter(match=f"{_PREFIX}*", count=1000):
+            bloom.add(key.decode('utf-8')[len(_PREFIX):])
+        return bloom
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            client = get_redis_client()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Subscribe before scanning so no revocation falls between the two
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                self._bloom = self._build(client)
+                rebuild_at = time.monotonic() + settings.REVOCATION_BLOOM_REBUILD_SECONDS
+                backoff = 1
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._bloom.add(message['data'].decode('utf-8'))
+                    if time.monotonic() >= rebuild_at:
+                        # Drops expired revocations, keeping the false-positive rate down
+                        self._bloom = self._build(client)
+                        rebuild_at = time.monotonic() + settings.REVOCATION_BLOOM_REBUILD_SECONDS
+            except Exception as e:
+                # Messages may be missed while disconnected, so stop trusting the filter
+                self._bloom = None
+                logger.warning(f"Token revocation listener disconnected: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                pubsub.close()
+
+
+revocation_store = RevocationStore()
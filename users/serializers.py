@@ -1,15 +1,40 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import UserProfile
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import ApiKey, UserProfile
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer, TokenRefreshSerializer, TokenVerifySerializer
+)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from .api_keys import ApiKeyService
+from .avatars import ORIGINAL_EXTENSIONS, AvatarService
+from .services import RegistrationService
+from .tokens import RefreshToken, UntypedToken
 
 User = get_user_model()
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class AvatarThumbnailsMixin(serializers.Serializer):
+    thumbnails = serializers.SerializerMethodField()
+    
+    def get_thumbnails(self, obj):
+        urls = obj.avatar_thumbnail_urls()
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: {fmt: request.build_absolute_uri(url) for fmt, url in formats.items()}
+                    for size, formats in urls.items()}
+        return urls
+
+
+class UserProfileSerializer(AvatarThumbnailsMixin, serializers.ModelSerializer):
     class Meta:
         model = UserProfile
-        fields = ['website', 'location', 'skills', 'email_notifications', 'marketing_emails']
+        fields = [
+            'website', 'location', 'skills', 'email_notifications', 'marketing_emails',
+            'avatar', 'avatar_status', 'thumbnails'
+        ]
+        read_only_fields = ['avatar', 'avatar_status']
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -60,8 +85,16 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
-    password = serializers.CharField(write_only=True)
+class BaseRegistrationSerializer(serializers.ModelSerializer):
+    """
+    Shared registration logic. The account (user, profile and wallet) is
+    created in one transaction by RegistrationService; subclasses pick the
+    role and whether the response carries a token pair for the new user.
+    """
+    registration_role = User.Role.CLIENT
+    return_tokens = True
+    
+    password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True)
     profile = UserProfileSerializer(required=False)
     
@@ -80,132 +113,35 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        profile_data = validated_data.pop('profile', None)
-        
-        # Create user with default role (CLIENT)
-        user = User.objects.create_user(**validated_data)
-        
-        # Create profile
-        if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
-        else:
-            UserProfile.objects.create(user=user)
-        
-        return user
+        return RegistrationService.register(self.registration_role, **validated_data)
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.return_tokens:
+            # Saves the client a separate /api/token/ call (and password hash)
+            data['tokens'] = RegistrationService.issue_tokens(instance)
+        return data
+
 
+class UserRegistrationSerializer(BaseRegistrationSerializer):
+    password = serializers.CharField(write_only=True)
 
-class ClientRegistrationSerializer(serializers.ModelSerializer):
+
+class ClientRegistrationSerializer(BaseRegistrationSerializer):
     """Serializer for client registration"""
-    password = serializers.CharField(write_only=True, min_length=8)
-    password_confirm = serializers.CharField(write_only=True)
-    profile = UserProfileSerializer(required=False)
-    
-    class Meta:
-        model = User
-        fields = [
-            'email', 'username', 'first_name', 'last_name', 'password',
-            'password_confirm', 'phone_number', 'company_name', 'bio',
-            'profile'
-        ]
-    
-    def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError("Passwords don't match")
-        return attrs
-    
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        profile_data = validated_data.pop('profile', None)
-        
-        # Create user with CLIENT role
-        user = User.objects.create_user(
-            **validated_data,
-            role=User.Role.CLIENT
-        )
-        
-        # Create profile
-        if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
-        else:
-            UserProfile.objects.create(user=user)
-        
-        return user
+    registration_role = User.Role.CLIENT
 
 
-class ToolCreatorRegistrationSerializer(serializers.ModelSerializer):
+class ToolCreatorRegistrationSerializer(BaseRegistrationSerializer):
     """Serializer for tool creator registration"""
-    password = serializers.CharField(write_only=True, min_length=8)
-    password_confirm = serializers.CharField(write_only=True)
-    profile = UserProfileSerializer(required=False)
-    
-    class Meta:
-        model = User
-        fields = [
-            'email', 'username', 'first_name', 'last_name', 'password',
-            'password_confirm', 'phone_number', 'company_name', 'bio',
-            'profile'
-        ]
-    
-    def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError("Passwords don't match")
-        return attrs
-    
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        profile_data = validated_data.pop('profile', None)
-        
-        # Create user with TOOL_CREATOR role
-        user = User.objects.create_user(
-            **validated_data,
-            role=User.Role.TOOL_CREATOR
-        )
-        
-        # Create profile
-        if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
-        else:
-            UserProfile.objects.create(user=user)
-        
-        return user
+    registration_role = User.Role.TOOL_CREATOR
 
 
-class AdminRegistrationSerializer(serializers.ModelSerializer):
+class AdminRegistrationSerializer(BaseRegistrationSerializer):
     """Serializer for admin registration (admin only)"""
-    password = serializers.CharField(write_only=True, min_length=8)
-    password_confirm = serializers.CharField(write_only=True)
-    profile = UserProfileSerializer(required=False)
-    
-    class Meta:
-        model = User
-        fields = [
-            'email', 'username', 'first_name', 'last_name', 'password',
-            'password_confirm', 'phone_number', 'company_name', 'bio',
-            'profile'
-        ]
-    
-    def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError("Passwords don't match")
-        return attrs
-    
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        profile_data = validated_data.pop('profile', None)
-        
-        # Create user with ADMIN role
-        user = User.objects.create_user(
-            **validated_data,
-            role=User.Role.ADMIN
-        )
-        
-        # Create profile
-        if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
-        else:
-            UserProfile.objects.create(user=user)
-        
-        return user
+    registration_role = User.Role.ADMIN
+    # The caller is another admin, who must not receive the new account's tokens
+    return_tokens = False
 
 
 class UserListSerializer(serializers.ModelSerializer):
@@ -268,21 +204,112 @@ class ClientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class AvatarUploadSerializer(serializers.ModelSerializer):
+class AvatarUploadSerializer(AvatarThumbnailsMixin, serializers.ModelSerializer):
+    avatar = serializers.ImageField()
+    
     class Meta:
         model = UserProfile
-        fields = ['avatar']
+        fields = ['avatar', 'avatar_status', 'thumbnails']
+        read_only_fields = ['avatar_status']
+    
+    def validate_avatar(self, value):
+        if value.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"Avatar must be at most {settings.AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+            )
+        if value.image.format not in ORIGINAL_EXTENSIONS:
+            raise serializers.ValidationError("Avatar must be a JPEG, PNG, WebP or GIF image")
+        return value
+    
+    def update(self, instance, validated_data):
+        return AvatarService.store(instance, validated_data['avatar'])
+
+
+class ApiKeySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ApiKey
+        fields = ['id', 'name', 'prefix', 'created_at', 'revoked_at']
+        read_only_fields = ['id', 'prefix', 'created_at', 'revoked_at']
+
+
+class ApiKeyCreateSerializer(ApiKeySerializer):
+    """Returns the full key once; only its hash is stored"""
+    key = serializers.CharField(read_only=True)
+    
+    class Meta(ApiKeySerializer.Meta):
+        fields = ApiKeySerializer.Meta.fields + ['key']
+    
+    def create(self, validated_data):
+        api_key, raw_key = ApiKeyService.issue(self.context['request'].user, validated_data.get('name', ''))
+        api_key.key = raw_key
+        return api_key
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+    
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        # Add custom claims
+        cls.add_user_claims(token, user)
+        return token
+    
+    @staticmethod
+    def add_user_claims(token, user):
+        """Claims stateless authentication reads instead of the user row"""
         token['role'] = user.role
         token['is_admin'] = user.is_admin
         token['is_tool_creator'] = user.is_tool_creator
         token['is_client'] = user.is_client
         token['email'] = user.email
         token['username'] = user.username
-        return token
\ No newline at end of file
+        token['caps'] = int(user.capabilities)
+
+
+class KeyRingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh with the user claims re-read from the row.
+    
+    Access tokens copy their claims from the refresh token, so without this a
+    role change (and the capability mask that follows from it) would not
+    reach them until the refresh token itself expired.
+    """
+    token_class = RefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        CustomTokenObtainPairSerializer.add_user_claims(refresh, user)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+    
+    def validate(self, attrs):
+        try:
+            attrs['token'] = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        return attrs
+
+
+class KeyRingTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        UntypedToken(attrs['token'])
+        return {}
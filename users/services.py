@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+import logging
+
+from balance.models import Wallet
+from .models import UserProfile
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class RegistrationService:
+    """Service class for creating accounts"""
+
+    @staticmethod
+    def register(role, email, username, password, profile=None, **fields):
+        """
+        Create a user with their profile and wallet.
+
+        The password is hashed before the transaction opens, so the
+        transaction is just the three INSERTs.
+        """
+        user = User(
+            email=User.objects.normalize_email(email),
+            username=User.normalize_username(username),
+            role=role,
+            password=make_password(password),
+            **fields
+        )
+        with transaction.atomic():
+            user.save(force_insert=True)
+            user.profile = UserProfile.objects.create(user=user, **(profile or {}))
+            Wallet.objects.create(user=user)
+        return user
+
+    @staticmethod
+    def issue_tokens(user):
+        """Same token pair /api/token/ returns for this user"""
+        from .serializers import CustomTokenObtainPairSerializer
+
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
@@ -0,0 +1,118 @@
+import os
+import time
+from unittest import mock
+
+import redis
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .capabilities import capabilities_for_role
+from .hashing import PooledPBKDF2PasswordHasher, hash_pool
+from .revocation import BloomFilter, RevocationStore, revocation_store
+from .serializers import CustomTokenObtainPairSerializer, KeyRingTokenRefreshSerializer
+from .tokens import AccessToken, RefreshToken
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class PooledPasswordHasherTests(TestCase):
+    def test_pooled_hasher_identifies_pbkdf2_hashes(self):
+        self.assertIsInstance(identify_hasher(make_password('secret')), PooledPBKDF2PasswordHasher)
+
+    def test_check_password_goes_through_pool(self):
+        encoded = make_password('secret')
+        with mock.patch.object(hash_pool, 'run', wraps=hash_pool.run) as run:
+            self.assertTrue(check_password('secret', encoded))
+        self.assertEqual(run.call_count, 1)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class TokenRefreshClaimsTests(TestCase):
+    def test_refreshed_access_token_carries_current_role(self):
+        user = User.objects.create_user(
+            email='creator@example.com', username='creator', password='secret', role=User.Role.TOOL_CREATOR,
+        )
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        User.objects.filter(pk=user.pk).update(role=User.Role.CLIENT)
+
+        serializer = KeyRingTokenRefreshSerializer(data={'refresh': str(refresh)})
+        serializer.is_valid(raise_exception=True)
+        access = AccessToken(serializer.validated_data['access'])
+
+        self.assertEqual(access['role'], User.Role.CLIENT)
+        self.assertEqual(access['caps'], int(capabilities_for_role(User.Role.CLIENT)))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='client@example.com', username='client', password='secret')
+
+    def test_revoked_jti_is_rejected(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        other = CustomTokenObtainPairSerializer.get_token(self.user)
+
+        revocation_store.revoke_token(refresh.payload)
+
+        with self.assertRaises(TokenError):
+            RefreshToken(str(refresh))
+        RefreshToken(str(other))
+
+    def test_user_cutoff_revokes_tokens_issued_before_its_second(self):
+        cutoff = int(time.time())
+        with mock.patch('users.revocation.time.time', return_value=cutoff + 0.75):
+            revocation_store.revoke_user(self.user.pk)
+
+        def payload(iat):
+            return {'jti': f"jti-{iat}", 'user_id': self.user.pk, 'iat': iat}
+
+        self.assertTrue(revocation_store.is_revoked(payload(cutoff - 1)))
+        self.assertFalse(revocation_store.is_revoked(payload(cutoff)))
+        self.assertFalse(revocation_store.is_revoked(payload(cutoff + 1)))
+
+    def test_rotation_blacklists_the_used_refresh_token(self):
+        refresh = str(CustomTokenObtainPairSerializer.get_token(self.user))
+
+        with mock.patch.object(api_settings, 'ROTATE_REFRESH_TOKENS', True):
+            serializer = KeyRingTokenRefreshSerializer(data={'refresh': refresh})
+            serializer.is_valid(raise_exception=True)
+            RefreshToken(serializer.validated_data['refresh'])
+
+            with self.assertRaises(TokenError):
+                KeyRingTokenRefreshSerializer(data={'refresh': refresh}).is_valid()
+
+
+class RevocationStoreRedisTests(TestCase):
+    def setUp(self):
+        self.store = RevocationStore()
+        # Pretend the listener is running so no thread is started
+        self.store._listener_pid = os.getpid()
+        self.client = mock.Mock()
+        self.client.mget.side_effect = redis.ConnectionError('down')
+        patcher = mock.patch('users.revocation.get_redis_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def payload(self, jti):
+        return {'jti': jti, 'user_id': 1, 'iat': int(time.time())}
+
+    def test_possible_match_fails_closed_when_redis_is_down(self):
+        self.store._bloom = BloomFilter(1024, 3)
+        self.store._bloom.add('jti:revoked')
+
+        self.assertTrue(self.store.is_revoked(self.payload('revoked')))
+
+    def test_bloom_miss_needs_no_redis(self):
+        self.store._bloom = BloomFilter(1024, 3)
+
+        self.assertFalse(self.store.is_revoked(self.payload('fresh')))
+        self.client.mget.assert_not_called()
+
+    def test_unsynced_filter_fails_open_when_redis_is_down(self):
+        self.assertFalse(self.store.is_revoked(self.payload('revoked')))
@@ -0,0 +1,120 @@
+import jwt
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .revocation import revocation_store
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Token backend that signs with the active key of ``settings.JWT_KEY_RING``
+    (adding its ``kid`` header) and verifies with whichever ring key the
+    token's ``kid`` names. Tokens without a ``kid`` are checked against the
+    active key.
+    """
+
+    def __init__(self, key_ring):
+        super().__init__(
+            key_ring.active.algorithm,
+            key_ring.active.private_pem,
+            key_ring.active.public_pem,
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+        self.key_ring = key_ring
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        key = self.key_ring.active
+        return jwt.encode(
+            jwt_payload,
+            key.private_key,
+            algorithm=key.algorithm,
+            headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid")) from ex
+
+        key = self.key_ring.get(kid) if kid else self.key_ring.active
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    "verify_aud": self.audience is not None,
+                    "verify_signature": verify,
+                },
+            )
+        except jwt.ExpiredSignatureError as ex:
+            raise TokenBackendExpiredToken(_("Token is expired")) from ex
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid")) from ex
+
+
+_token_backend = None
+
+
+def get_token_backend():
+    global _token_backend
+    if _token_backend is None:
+        _token_backend = KeyRingTokenBackend(settings.JWT_KEY_RING)
+    return _token_backend
+
+
+class KeyRingTokenMixin:
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class RevocableTokenMixin:
+    """
+    Rejects revoked tokens (see users.revocation). ``blacklist()`` revokes, so
+    simplejwt's BLACKLIST_AFTER_ROTATION works without the token_blacklist app.
+    """
+
+    def verify(self):
+        super().verify()
+        if revocation_store.is_revoked(self.payload):
+            raise TokenError(_("Token has been revoked"))
+
+    def blacklist(self):
+        revocation_store.revoke_token(self.payload)
+
+    def outstand(self):
+        # Revocation needs no outstanding-token table
+        return None
+
+
+class AccessToken(RevocableTokenMixin, KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(RevocableTokenMixin, KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+
+class UntypedToken(RevocableTokenMixin, KeyRingTokenMixin, tokens.UntypedToken):
+    pass
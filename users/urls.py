@@ -3,12 +3,13 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ToolCreatorViewSet, ClientViewSet, UserDetailView, UserAvatarUploadView,
     ClientRegistrationView, ToolCreatorRegistrationView, AdminRegistrationView,
-    CurrentUserIdView
+    CurrentUserIdView, UserTokenRevokeView, ApiKeyViewSet
 )
 
 router = DefaultRouter()
 router.register(r'tool-creators', ToolCreatorViewSet, basename='tool-creator')
 router.register(r'clients', ClientViewSet, basename='client')
+router.register(r'api-keys', ApiKeyViewSet, basename='api-key')
 
 urlpatterns = [
     path('me/', UserDetailView.as_view(), name='user-detail'),
@@ -18,6 +19,7 @@ urlpatterns = [
     path('register/client/', ClientRegistrationView.as_view(), name='client-register'),
     path('register/tool-creator/', ToolCreatorRegistrationView.as_view(), name='tool-creator-register'),
     path('register/admin/', AdminRegistrationView.as_view(), name='admin-register'),
+    path('<int:pk>/revoke-tokens/', UserTokenRevokeView.as_view(), name='user-revoke-tokens'),
 
     path('', include(router.urls))
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, mixins
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,10 +9,14 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExam
 
 from .serializers import (
     ToolCreatorSerializer, ClientSerializer, UserSerializer, AvatarUploadSerializer,
-    ClientRegistrationSerializer, ToolCreatorRegistrationSerializer, AdminRegistrationSerializer
+    ClientRegistrationSerializer, ToolCreatorRegistrationSerializer, AdminRegistrationSerializer,
+    TokenRevokeSerializer, ApiKeySerializer, ApiKeyCreateSerializer
 )
-from .permissions import IsToolCreator, IsClient, IsAdmin
-from .models import UserProfile
+from .permissions import IsToolCreator, IsClient, IsAdmin, IsNotApiKey, CanManageApiKeys
+from .models import ApiKey, UserProfile
+from .revocation import revocation_store
+from .tokens import AccessToken
+from .api_keys import ApiKeyService
 
 User = get_user_model()
 
@@ -20,7 +24,8 @@ User = get_user_model()
 @extend_schema_view(
     post=extend_schema(
         summary="Register a new client",
-        description="Create a new client account with basic information",
+        description="Create a new client account with basic information. The response includes "
+                    "`tokens` (`access` and `refresh`), so no separate login is needed.",
         tags=["Registration"],
         examples=[
             OpenApiExample(
@@ -42,6 +47,7 @@ User = get_user_model()
 )
 class ClientRegistrationView(generics.CreateAPIView):
     """View for client registration"""
+    throttle_scope = 'register'
     queryset = User.objects.all()
     serializer_class = ClientRegistrationSerializer
     permission_classes = [AllowAny]
@@ -67,7 +73,7 @@ class ClientRegistrationView(generics.CreateAPIView):
 class UserDetailView(generics.RetrieveUpdateAPIView):
     """View for getting and updating current user details"""
     serializer_class = UserSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsNotApiKey]
     
     def get_object(self):
         return self.request.user
@@ -87,9 +93,22 @@ class CurrentUserIdView(APIView):
         return self.request.user.pk
 
 
+@extend_schema_view(
+    put=extend_schema(
+        summary="Upload avatar",
+        description="Store a new avatar. Returns 202 while thumbnails are generated in the background; "
+                    "`thumbnails` lists WebP and JPEG URLs per size once `avatar_status` is `ready`.",
+        tags=["User Profile"]
+    ),
+    patch=extend_schema(
+        summary="Upload avatar",
+        description="Same as PUT",
+        tags=["User Profile"]
+    ),
+)
 class UserAvatarUploadView(generics.UpdateAPIView):
     serializer_class = AvatarUploadSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsNotApiKey]
     parser_classes = [MultiPartParser, FormParser]
 
     def get_object(self):
@@ -97,11 +116,18 @@ class UserAvatarUploadView(generics.UpdateAPIView):
         profile, created = UserProfile.objects.get_or_create(user=user)
         return profile
 
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        if response.data.get('avatar_status') == UserProfile.AvatarStatus.PROCESSING:
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
 
 @extend_schema_view(
     post=extend_schema(
         summary="Register a new tool creator",
-        description="Create a new tool creator account with basic information",
+        description="Create a new tool creator account with basic information. The response includes "
+                    "`tokens` (`access` and `refresh`), so no separate login is needed.",
         tags=["Registration"],
         examples=[
             OpenApiExample(
@@ -123,6 +149,7 @@ class UserAvatarUploadView(generics.UpdateAPIView):
 )
 class ToolCreatorRegistrationView(generics.CreateAPIView):
     """View for tool creator registration"""
+    throttle_scope = 'register'
     queryset = User.objects.all()
     serializer_class = ToolCreatorRegistrationSerializer
     permission_classes = [AllowAny]
@@ -153,9 +180,51 @@ class ToolCreatorRegistrationView(generics.CreateAPIView):
 )
 class AdminRegistrationView(generics.CreateAPIView):
     """View for admin registration (admin only)"""
+    throttle_scope = 'register'
     queryset = User.objects.all()
     serializer_class = AdminRegistrationSerializer
-    permission_classes = [IsAdmin]
+    permission_classes = [IsAdmin, IsNotApiKey]
+
+
+@extend_schema_view(
+    post=extend_schema(
+        summary="Log out (revoke tokens)",
+        description="Revoke the given refresh token and, if the request is authenticated, the access "
+                    "token it carries. Takes effect on every worker within seconds.",
+        tags=["Authentication"],
+        request=TokenRevokeSerializer,
+        responses={204: None}
+    )
+)
+class TokenRevokeView(APIView):
+    permission_classes = [IsNotApiKey]
+
+    def post(self, request):
+        serializer = TokenRevokeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revocation_store.revoke_token(serializer.validated_data['token'].payload)
+        if isinstance(request.auth, AccessToken):
+            revocation_store.revoke_token(request.auth.payload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema_view(
+    post=extend_schema(
+        summary="Revoke all of a user's tokens",
+        description="Invalidate every access and refresh token issued to the user so far (admin only)",
+        tags=["Authentication"],
+        request=None,
+        responses={204: None}
+    )
+)
+class UserTokenRevokeView(APIView):
+    permission_classes = [IsAdmin, IsNotApiKey]
+
+    def post(self, request, pk):
+        if not User.objects.filter(pk=pk).exists():
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        revocation_store.revoke_user(pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @extend_schema_view(
@@ -246,4 +315,41 @@ class ClientViewSet(viewsets.ReadOnlyModelViewSet):
             'points_balance': user.points_balance,
             'can_use_services': user.can_use_services(),
         }
-        return Response(data) 
\ No newline at end of file
+        return Response(data) 
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="List API keys",
+        description="Get the current user's API keys. Only the prefix of each key is shown.",
+        tags=["API Keys"]
+    ),
+    create=extend_schema(
+        summary="Create API key",
+        description="Issue a new API key. The full key (`tk_<prefix>_<secret>`) is returned in `key` "
+                    "only in this response; send it as `Authorization: Api-Key <key>`.",
+        tags=["API Keys"]
+    ),
+    destroy=extend_schema(
+        summary="Revoke API key",
+        description="Revoke an API key. Takes effect on every worker within seconds.",
+        tags=["API Keys"]
+    )
+)
+class ApiKeyViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """ViewSet for managing the current user's API keys"""
+    permission_classes = [CanManageApiKeys, IsNotApiKey]
+    
+    def get_queryset(self):
+        return ApiKey.objects.filter(user_id=self.request.user.id)
+    
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ApiKeyCreateSerializer
+        return ApiKeySerializer
+    
+    def perform_destroy(self, instance):
+        # Kept for auditing; a revoked key never authenticates again
+        ApiKeyService.revoke(instance)
+